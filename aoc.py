@@ -1,17 +1,66 @@
 #!/usr/bin/env python3
 
-import argparse
+import contextlib
 import importlib
+import io
+import itertools
+import math
 import os
 import sys
+import time
+
+# Everything else is imported by the functions that need it, so that a plain single-day run only
+# pays for what it uses. See --startup-report.
 
 DAY_TEMPLATE = """\
 # Advent of Code 2021
 # Day {day}
 
-import itertools, re
-from dataclasses import dataclass
-from pprint import pprint
+import itertools, logging, re
+
+# diagnostics go through log rather than print so that aoc.py -q/-v can turn them off/on.
+# Use %-style arguments so messages that are turned off never get formatted.
+log = logging.getLogger(__name__)
+
+# Optional: if parse() is defined, it's called once on the input and its result is passed to
+# both parts instead of the raw string. The result is shared and cached, treat it as read-only.
+#def parse(data):
+#    return data.splitlines()
+
+# Optional: parse_file(filename) is used instead of parse() for the real input, for days which
+# want to read (or split up) a big input file themselves. It should return the same thing as
+# parse(), and its result isn't cached.
+#def parse_file(filename):
+#    with open(filename) as fp:
+#        return parse(fp.read())
+
+# Optional: STREAM_PARTS lists the parts which also work on a lazy iterable, for aoc.py --stream.
+# They're given parse_lines(lines) (or just lines if there's no parse_lines), where lines is an
+# iterator over the input lines without newlines, and shouldn't need more than one pass.
+#def parse_lines(lines):
+#    return (int(line) for line in lines)
+#STREAM_PARTS = (1, 2)
+
+# Optional: set GRID_INPUT = True if the input is a rectangular grid of digits. The parts then get
+# (cells, rows, cols) straight from aoc.py's mmap-backed load_grid instead of parse(data), where
+# cells is a flat row-major memoryview of the digit values. parse() should return the same thing
+# for the test cases.
+#GRID_INPUT = True
+
+# Optional: verify_part_1(data) and verify_part_2(data) are slow but obviously-correct versions
+# of the parts which aoc.py --verify checks the answers against. They get the same data as the
+# parts, or the raw input string if VERIFY_RAW_INPUT is set. aoc.py --scale only checks them on
+# inputs up to VERIFY_MAX_N_1 / VERIFY_MAX_N_2 items (default 100).
+#VERIFY_RAW_INPUT = True
+#VERIFY_MAX_N_1 = 10_000
+
+# Optional: check(data) cross-checks the day's different engines against each other on the input
+# and raises AssertionError saying what disagreed. aoc.py --verify runs it after the parts.
+
+# Optional: generate(n, rng) returns a random input with about n items (lines, boards, cells...)
+# using rng, a random.Random. aoc.py --scale uses it to see how the parts scale with input size.
+#def generate(n, rng):
+#    return ''.join(f'{{rng.randrange(1000)}}\\n' for _ in range(n))
 
 def part_1(data):
     raise NotImplementedError()
@@ -38,8 +87,57 @@ def create_template(days):
         except OSError as e:
             return f'Error writing {filename}: {e}'
 
+# where --download gets inputs from, can be pointed at a stand-in server for testing
+AOC_URL = os.environ.get('AOC_URL', 'https://adventofcode.com/2021')
+# how many days --download fetches at once
+DOWNLOAD_JOBS = 8
+DOWNLOAD_TIMEOUT = 30
+DOWNLOAD_CHUNK_SIZE = 1 << 16
+
+def input_is_valid(filename):
+    # Inputs never change once they're published, so one we already have is good as long as it's
+    # complete. Downloads are renamed into place only once they've finished, so anything
+    # non-empty ending in a newline is complete.
+    try:
+        with open(filename, 'rb') as fp:
+            fp.seek(-1, os.SEEK_END)
+            return fp.read(1) == b'\n'
+    except OSError:
+        # missing, or empty so the seek failed
+        return False
+
+def fetch_input(session, day):
+    # download one day's input, streaming it to a temp file which replaces data/NN.txt once
+    # it's complete. Returns (message, error).
+    import requests
+    filename = os.path.join('data', f'{day:02}.txt')
+    if input_is_valid(filename):
+        return f'Data for day {day} already downloaded', None
+    tmp_filename = f'{filename}.{os.getpid()}.tmp'
+    try:
+        with session.get(f'{AOC_URL}/day/{day}/input', stream=True, timeout=DOWNLOAD_TIMEOUT) as resp:
+            resp.raise_for_status()
+            with open(tmp_filename, 'wb') as fp:
+                for chunk in resp.iter_content(DOWNLOAD_CHUNK_SIZE):
+                    fp.write(chunk)
+        if not input_is_valid(tmp_filename):
+            return None, f'Error getting puzzle input for day {day}: incomplete response'
+        os.replace(tmp_filename, filename)
+    # RequestException is an OSError too, so it has to come first
+    except requests.RequestException as e:
+        return None, f'Error getting puzzle input for day {day}: {e}'
+    except OSError as e:
+        return None, f'Error writing puzzle input for day {day}: {e}'
+    finally:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_filename)
+    return f'Downloaded data for day {day}', None
+
 def download_input(days):
+    # Fetch every day's input at once over a shared pool of connections. Days we already have
+    # are skipped without a request.
     # lazy import so requests is only required here and not to run the puzzles
+    import concurrent.futures
     import requests
     home = os.environ.get('HOME')
     if not home:
@@ -51,38 +149,422 @@ def download_input(days):
     except OSError as e:
         return f'Error reading session cookie file: {e}'
 
-    headers = {'Cookie': f'session={session_cookie}'}
-    for day in days:
-        filename = os.path.join(f'data/{day:02}.txt')
-        print(f'Downloaded data for day {day}')
-        if os.path.exists(filename):
-            print(f'Warning: data file {filename} already exists. Re-downloading')
-        try:
-            resp = requests.get(f'https://adventofcode.com/2021/day/{day}/input', headers=headers)
-            resp.raise_for_status()
-            with open(filename, 'w') as fp:
-                fp.write(resp.text)
-        except requests.HTTPError as e:
-            return f'Error getting puzzle input: {e}'
-        except OSError as e:
-            return f'Error writing puzzle input: {e}'
+    try:
+        os.makedirs('data', exist_ok=True)
+    except OSError as e:
+        return f'Error creating data directory: {e}'
+
+    jobs = max(1, min(DOWNLOAD_JOBS, len(days)))
+    errors = []
+    with requests.Session() as session:
+        # one kept-alive connection per worker thread
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=jobs)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers['Cookie'] = f'session={session_cookie}'
+        with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as pool:
+            # report in day order, every day even if an earlier one failed
+            for message, err in pool.map(lambda day: fetch_input(session, day), days):
+                if err is not None:
+                    errors.append(err)
+                else:
+                    print(message)
+    if errors:
+        return '\n'.join(errors)
+
+PROFILE_DIR = 'profiles'
+# seconds of CPU time between samples for --profile sample
+SAMPLE_INTERVAL = 0.001
+# set by setup_profiling
+PROFILE_MODE = None
+PROFILE_TOP = 20
+
+def setup_profiling(mode, top):
+    global PROFILE_MODE, PROFILE_TOP
+    PROFILE_MODE = mode
+    PROFILE_TOP = top
+
+def write_folded(filename, counts):
+    # collapsed stack format (one "outer;inner;leaf count" per line), which flamegraph.pl,
+    # speedscope and friends all understand
+    with open(filename, 'w') as fp:
+        for stack, count in sorted(counts.items()):
+            fp.write(f'{stack} {count}\n')
+
+def frame_name(code):
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+def profile_cprofile(func, data, base):
+    import cProfile
+    import pstats
+    prof = cProfile.Profile()
+    try:
+        return prof.runcall(func, data)
+    finally:
+        prof.dump_stats(f'{base}.prof')
+        print(f'cProfile stats written to {base}.prof, top {PROFILE_TOP} by cumulative time:')
+        pstats.Stats(prof, stream=sys.stdout).strip_dirs().sort_stats('cumulative').print_stats(PROFILE_TOP)
+
+def profile_tracemalloc(func, data, base):
+    # Records where the memory that's still allocated when func returns came from (so what it
+    # returns, or leaves in caches and globals), as a flamegraph weighted by bytes.
+    import collections
+    import tracemalloc
+    tracemalloc.start(64)
+    try:
+        return func(data)
+    finally:
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        snapshot = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+        counts = collections.Counter()
+        for stat in snapshot.statistics('traceback'):
+            # tracebacks are most recent call first
+            stack = ';'.join(f'{os.path.basename(f.filename)}:{f.lineno}' for f in reversed(stat.traceback))
+            counts[stack] += stat.size
+        write_folded(f'{base}.folded', counts)
+        print(f'tracemalloc stacks written to {base}.folded, peak {peak / 1024:,.1f} KiB, '
+              f'top {PROFILE_TOP} lines by retained size:')
+        for stat in snapshot.statistics('lineno')[:PROFILE_TOP]:
+            print(f'  {stat}')
 
-def run_part(mod, part, data):
+def profile_sample(func, data, base):
+    # Statistical profiler: a SIGPROF timer interrupts func every SAMPLE_INTERVAL of CPU time and
+    # we record the whole stack, up to this function.
+    import collections
+    import signal
+    counts = collections.Counter()
+    top = sys._getframe()
+
+    def handler(signum, frame):
+        stack = []
+        while frame is not None and frame is not top:
+            stack.append(frame_name(frame.f_code))
+            frame = frame.f_back
+        # ignore samples that land in our own code just before or after func
+        if stack:
+            counts[';'.join(reversed(stack))] += 1
+
+    old_handler = signal.signal(signal.SIGPROF, handler)
+    signal.setitimer(signal.ITIMER_PROF, SAMPLE_INTERVAL, SAMPLE_INTERVAL)
+    try:
+        return func(data)
+    finally:
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, old_handler)
+        write_folded(f'{base}.folded', counts)
+        total = sum(counts.values())
+        # self samples are stacks ending in the function, total are stacks which contain it
+        own = collections.Counter()
+        inclusive = collections.Counter()
+        for stack, count in counts.items():
+            frames = stack.split(';')
+            own[frames[-1]] += count
+            for name in set(frames):
+                inclusive[name] += count
+        print(f'{total} samples written to {base}.folded, top {PROFILE_TOP} by self samples:')
+        for name, count in own.most_common(PROFILE_TOP):
+            print(f'  {count:6} self {count / total:6.1%}  {inclusive[name]:6} total  {name}')
+
+PROFILERS = {
+    'cprofile': profile_cprofile,
+    'tracemalloc': profile_tracemalloc,
+    'sample': profile_sample,
+}
+
+def run_part(mod, part, data, name=None):
+    # name is the base filename used for --profile output, defaults to day-NN-part-N
     if (func := getattr(mod, f'part_{part}', None)) is not None:
         try:
-            return func(data)
+            if PROFILE_MODE is None:
+                return func(data)
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            base = os.path.join(PROFILE_DIR, name or f'{mod.__name__}-part-{part}')
+            return PROFILERS[PROFILE_MODE](func, data, base)
         except NotImplementedError:
             pass
     return '[not implemented]'
 
+def parse_input(mod, data):
+    if (parse := getattr(mod, 'parse', None)) is not None:
+        return parse(data)
+    return data
+
+# in-memory parse cache, data filename -> (cache key, parsed object)
+PARSE_CACHE = {}
+
+def source_hash(mod):
+    # any change to the day's source could change what parse() returns
+    import hashlib
+    with open(mod.__file__, 'rb') as fp:
+        return hashlib.sha256(fp.read()).hexdigest()
+
+def load_parsed(mod, data_filename):
+    # Parse the input file with mod.parse(), caching the result both in memory and on disk as
+    # data/NN.pickle. A cache hit is decided by the input's mtime and size without reading it;
+    # if those changed we fall back to comparing the input's hash before re-parsing.
+    import hashlib
+    import pickle
+    st = os.stat(data_filename)
+    parser_hash = source_hash(mod)
+    key = (st.st_mtime_ns, st.st_size, parser_hash)
+    if (hit := PARSE_CACHE.get(data_filename)) is not None and hit[0] == key:
+        return hit[1]
+
+    cache_filename = os.path.splitext(data_filename)[0] + '.pickle'
+    try:
+        with open(cache_filename, 'rb') as fp:
+            cached = pickle.load(fp)
+    except Exception:
+        # missing, corrupt, or refers to classes that no longer exist. Just re-parse.
+        cached = None
+    if cached is not None and (cached['mtime_ns'], cached['size'], cached['parser_hash']) == key:
+        PARSE_CACHE[data_filename] = (key, cached['parsed'])
+        return cached['parsed']
+
+    with open(data_filename, 'rb') as fp:
+        raw = fp.read()
+    input_hash = hashlib.sha256(raw).hexdigest()
+    if cached is not None and cached['input_hash'] == input_hash and cached['parser_hash'] == parser_hash:
+        parsed = cached['parsed']
+    else:
+        parsed = mod.parse(raw.decode())
+
+    PARSE_CACHE[data_filename] = (key, parsed)
+    cached = {
+        'mtime_ns': st.st_mtime_ns,
+        'size': st.st_size,
+        'input_hash': input_hash,
+        'parser_hash': parser_hash,
+        'parsed': parsed,
+    }
+    # write to a temp file and rename so a concurrent reader never sees a partial pickle
+    tmp_filename = f'{cache_filename}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_filename, 'wb') as fp:
+            pickle.dump(cached, fp, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_filename, cache_filename)
+    except (OSError, pickle.PicklingError, TypeError, AttributeError):
+        # the disk cache is only an optimization, not being able to write it is fine
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_filename)
+    return parsed
+
+# answers from previous runs, one pickle per result named by its key
+RESULT_CACHE_DIR = 'cache'
+# least recently used results are removed once the cache is bigger than this
+RESULT_CACHE_MAX_BYTES = 1 << 20
+# turned off by --no-cache, --profile and --verbose
+USE_RESULT_CACHE = True
+
+def setup_result_cache(enabled):
+    global USE_RESULT_CACHE
+    USE_RESULT_CACHE = enabled
+
+def file_hash(filename):
+    import hashlib
+    h = hashlib.sha256()
+    with open(filename, 'rb') as fp:
+        while chunk := fp.read(STREAM_BUFSIZE):
+            h.update(chunk)
+    return h.hexdigest()
+
+# hash of the aoc.py source that's running, see result_key
+RUNNER_HASH = None
+
+def runner_hash():
+    # hashed once, a --serve process keeps running the aoc.py it started with even if it changes
+    global RUNNER_HASH
+    if RUNNER_HASH is None:
+        RUNNER_HASH = source_hash(sys.modules[__name__])
+    return RUNNER_HASH
+
+def result_key(mod, part, input_hash):
+    # A part's answer only depends on the day's code, its input and which part it is, plus
+    # aoc.py itself since load_grid, parse_file and stream_input decide what the part gets.
+    # Returns None if the cache is turned off.
+    import hashlib
+    if not USE_RESULT_CACHE:
+        return None
+    key = f'{source_hash(mod)} {runner_hash()} {input_hash} {part}'
+    return hashlib.sha256(key.encode()).hexdigest()
+
+def load_result(key):
+    # returns {'result': answer} on a cache hit, or None
+    import pickle
+    filename = os.path.join(RESULT_CACHE_DIR, f'{key}.pickle')
+    try:
+        with open(filename, 'rb') as fp:
+            cached = pickle.load(fp)
+    except Exception:
+        # missing or corrupt, just recompute it
+        return None
+    # the mtime is when it was last used, for evict_results
+    with contextlib.suppress(OSError):
+        os.utime(filename)
+    return cached
+
+def store_result(key, result):
+    import pickle
+    filename = os.path.join(RESULT_CACHE_DIR, f'{key}.pickle')
+    tmp_filename = f'{filename}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(RESULT_CACHE_DIR, exist_ok=True)
+        with open(tmp_filename, 'wb') as fp:
+            pickle.dump({'result': result}, fp, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_filename, filename)
+    except (OSError, pickle.PicklingError, TypeError, AttributeError):
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_filename)
+        return
+    evict_results()
+
+def evict_results():
+    # remove the least recently used results until the cache fits in RESULT_CACHE_MAX_BYTES
+    entries = []
+    with os.scandir(RESULT_CACHE_DIR) as it:
+        for entry in it:
+            if entry.name.endswith('.pickle'):
+                with contextlib.suppress(OSError):
+                    st = entry.stat()
+                    entries.append((st.st_mtime_ns, st.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= RESULT_CACHE_MAX_BYTES:
+            break
+        # another process might have beaten us to it
+        with contextlib.suppress(OSError):
+            os.unlink(path)
+        total -= size
+
+# translate digits to their values, anything else (except newlines, which are deleted) to 0xff
+GRID_DIGITS = bytes(range(10)).join([b'\xff' * ord('0'), b'\xff' * (255 - ord('9'))])
+# rows per chunk when converting a grid without numpy
+GRID_CHUNK_ROWS = 4096
+# smaller grids are converted without numpy, which takes longer to import than they take to translate
+GRID_NUMPY_MIN_BYTES = 1 << 20
+
+def load_grid(filename):
+    # Load a grid of digits with one row per line as (cells, rows, cols), where cells is a flat
+    # row-major memoryview of values 0-9. The file is mmapped rather than read, and for big grids
+    # with numpy the newline column is skipped with a strided view over the mmap, so the only copy
+    # is the one byte per cell result of subtracting '0'.
+    import mmap
+    with open(filename, 'rb') as fp:
+        mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+    cols = mm.find(b'\n')
+    if cols < 0:
+        cols = len(mm)
+    stride = cols + 1
+    # the last line might not have a newline
+    rows = (len(mm) + 1) // stride
+    if cols == 0 or len(mm) not in (rows * stride, rows * stride - 1):
+        raise ValueError(f'{filename} is not a rectangular grid')
+
+    np = None
+    if len(mm) >= GRID_NUMPY_MIN_BYTES:
+        from lazy_numpy import import_numpy
+        np = import_numpy()
+
+    if np is not None:
+        raw = np.frombuffer(mm, dtype=np.uint8)
+        if (raw[cols::stride] != ord('\n')).any():
+            raise ValueError(f'{filename} is not a rectangular grid')
+        view = np.lib.stride_tricks.as_strided(raw, shape=(rows, cols), strides=(stride, 1))
+        cells = view - np.uint8(ord('0'))
+        del raw, view
+        if (cells > 9).any():
+            raise ValueError(f'{filename} has non-digit characters')
+        cells = memoryview(cells.reshape(-1))
+    else:
+        # no numpy, translate a chunk of rows at a time so we never hold more than one extra
+        # copy of a chunk
+        cells = bytearray(rows * cols)
+        chunk = GRID_CHUNK_ROWS * stride
+        for i, start in enumerate(range(0, len(mm), chunk)):
+            raw = mm[start:start + chunk]
+            # every row must end in a newline at the same column, same as the numpy check
+            if raw[cols::stride].strip(b'\n'):
+                raise ValueError(f'{filename} is not a rectangular grid')
+            part = raw.translate(GRID_DIGITS, b'\n')
+            # a stray newline anywhere else would shift everything, so check the chunk came out
+            # the right size
+            expected = min(GRID_CHUNK_ROWS, rows - i * GRID_CHUNK_ROWS) * cols
+            if len(part) != expected:
+                raise ValueError(f'{filename} is not a rectangular grid')
+            if b'\xff' in part:
+                raise ValueError(f'{filename} has non-digit characters')
+            offset = i * GRID_CHUNK_ROWS * cols
+            cells[offset:offset + len(part)] = part
+        cells = memoryview(cells)
+    mm.close()
+    return cells, rows, cols
+
+def load_input(mod, day):
+    # returns (data, error). data is the parsed input if the day has a parse() hook, or the raw
+    # string if not.
+    data_filename = os.path.join('data', f'{day:02}.txt')
+    try:
+        if getattr(mod, 'GRID_INPUT', False):
+            return load_grid(data_filename), None
+        if (parse_file := getattr(mod, 'parse_file', None)) is not None:
+            return parse_file(data_filename), None
+        if getattr(mod, 'parse', None) is not None:
+            return load_parsed(mod, data_filename), None
+        with open(data_filename) as fp:
+            return fp.read(), None
+    except (OSError, ValueError) as e:
+        return None, f'Error reading input data: {e}'
+
+def read_raw_input(day):
+    # returns (data, error) like load_input, but always the unparsed input string
+    try:
+        with open(os.path.join('data', f'{day:02}.txt')) as fp:
+            return fp.read(), None
+    except OSError as e:
+        return None, f'Error reading input data: {e}'
+
+# read buffer size for --stream
+STREAM_BUFSIZE = 1 << 20
+
+def stream_lines(filename):
+    # lazily yield the lines of filename without their newlines, the file is closed once the
+    # generator is exhausted or thrown away.
+    with open(filename, buffering=STREAM_BUFSIZE) as fp:
+        for line in fp:
+            yield line[:-1] if line.endswith('\n') else line
+
+def stream_input(mod, day):
+    # returns (data, error) like load_input, but data is a lazy iterable over the input
+    data_filename = os.path.join('data', f'{day:02}.txt')
+    try:
+        # open it now so a missing file is an error here rather than when the part starts reading
+        lines = stream_lines(data_filename)
+        lines = itertools.chain([next(lines)], lines)
+    except StopIteration:
+        lines = iter(())
+    except OSError as e:
+        return None, f'Error reading input data: {e}'
+    if (parse_lines := getattr(mod, 'parse_lines', None)) is not None:
+        return parse_lines(lines), None
+    return lines, None
+
 def run_test_part(mod, part):
+    import hashlib
     ok = True
     if (cases := getattr(mod, f'TEST_CASE_{part}', None)) is not None:
         if part != 1:
             print()
         print(f'Running test cases for part {part}:')
         for i, (data, output) in enumerate(cases):
-            ret = run_part(mod, part, data)
+            key = result_key(mod, part, hashlib.sha256(data.encode()).hexdigest())
+            if key is not None and (hit := load_result(key)) is not None:
+                ret = hit['result']
+            else:
+                ret = run_part(mod, part, parse_input(mod, data), f'{mod.__name__}-part-{part}-test-{i}')
+                if key is not None:
+                    store_result(key, ret)
             if ret == output:
                 print(f'Part {part} test case {i} PASS. ({output=})')
             else:
@@ -92,49 +574,732 @@ def run_test_part(mod, part):
         print(f'No test cases for part {part}')
     return ok
 
-def run_day(day, test):
+def run_day(day, test, parts=(1, 2), verify=False, stream=False):
     try:
-        mod_name = f'day-{day:02}'
-        mod = importlib.import_module(mod_name)
+        mod = import_day(day)
     except ModuleNotFoundError as e:
         return f'unable to import: {e}'
 
     if test:
-        r1 = run_test_part(mod, 1)
-        r2 = run_test_part(mod, 2)
-        return None if r1 and r2 else 'test cases failed'
+        # run every part even if an earlier one fails so we see all the results
+        results = [run_test_part(mod, part) for part in parts]
+        return None if all(results) else 'test cases failed'
 
-    data_filename = os.path.join('data', f'{day:02}.txt')
-    try:
-        with open(data_filename) as fp:
-            data = fp.read()
-    except OSError as e:
-        return f'Error reading input data: {e}'
+    input_hash = None
+    if USE_RESULT_CACHE:
+        try:
+            input_hash = file_hash(os.path.join('data', f'{day:02}.txt'))
+        except OSError:
+            # loading it below will report the error
+            pass
+
+    # only read the whole input if some part actually needs it
+    data = None
+    for part in parts:
+        key = result_key(mod, part, input_hash) if input_hash is not None else None
+        if (hit := load_result(key) if key is not None else None) is None:
+            if stream and part in getattr(mod, 'STREAM_PARTS', ()):
+                part_data, err = stream_input(mod, day)
+            else:
+                if data is None:
+                    data, err = load_input(mod, day)
+                part_data = data
+            if err is not None:
+                return err
 
-    for part in (1, 2):
         if part != 1:
             print()
         print(f'Part {part}')
-        ret = run_part(mod, part, data)
+        if hit is not None:
+            ret = hit['result']
+        else:
+            ret = run_part(mod, part, part_data)
+            if key is not None:
+                store_result(key, ret)
         fmt = getattr(mod, f'FORMAT_{part}', '{}')
         print(fmt.format(ret))
+        # cross-check against the day's slow reference implementation, if it has one
+        if verify and (func := getattr(mod, f'verify_part_{part}', None)) is not None:
+            if getattr(mod, 'VERIFY_RAW_INPUT', False):
+                verify_data, err = read_raw_input(day)
+            else:
+                if data is None:
+                    data, err = load_input(mod, day)
+                verify_data = data
+            if err is not None:
+                return err
+            if (expected := func(verify_data)) != ret:
+                return f'part {part} verification failed: expected "{expected}", got "{ret}"'
+            print(f'Part {part} verified')
 
-def run_days(days, test):
+    if verify and (check := getattr(mod, 'check', None)) is not None:
+        if data is None:
+            data, err = load_input(mod, day)
+            if err is not None:
+                return err
+        try:
+            check(data)
+        except AssertionError as e:
+            return f'check failed: {e}'
+        print('Checks passed')
+
+def percentile(samples, pct):
+    # nearest-rank percentile, samples must be sorted
+    return samples[max(0, math.ceil(pct / 100 * len(samples)) - 1)]
+
+def bench_func(func, iterations, warmup):
+    # time func() iterations times after warmup untimed calls, then make one more call under
+    # tracemalloc to get the peak memory. tracemalloc slows everything down a lot so it's kept
+    # out of the timed runs. Output is discarded, every day prints stuff we don't want to time.
+    import statistics
+    import tracemalloc
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(warmup):
+            func()
+        times = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+        tracemalloc.start()
+        try:
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    times.sort()
+    return {
+        'min': times[0],
+        'median': statistics.median(times),
+        'p95': percentile(times, 95),
+        'peak_mem': peak,
+    }
+
+def bench_day(day, iterations, warmup):
+    try:
+        mod = import_day(day)
+    except ModuleNotFoundError as e:
+        return None, f'unable to import: {e}'
+
+    data_filename = os.path.join('data', f'{day:02}.txt')
+    def read_input():
+        with open(data_filename) as fp:
+            return fp.read()
+    try:
+        data = read_input()
+    except OSError as e:
+        return None, f'Error reading input data: {e}'
+
+    results = {'read': bench_func(read_input, iterations, warmup)}
+    if getattr(mod, 'GRID_INPUT', False):
+        # real runs load grids straight from the file, so that's what parsing costs
+        try:
+            data = load_grid(data_filename)
+        except ValueError as e:
+            return None, f'Error reading input data: {e}'
+        results['parse'] = bench_func(lambda: load_grid(data_filename), iterations, warmup)
+    elif (parse_file := getattr(mod, 'parse_file', None)) is not None:
+        results['parse'] = bench_func(lambda: parse_file(data_filename), iterations, warmup)
+        data = parse_file(data_filename)
+    elif getattr(mod, 'parse', None) is not None:
+        # time parse() directly, the parse cache would make this meaningless
+        results['parse'] = bench_func(lambda: mod.parse(data), iterations, warmup)
+        data = mod.parse(data)
+    for part in (1, 2):
+        results[f'part_{part}'] = bench_func(lambda: run_part(mod, part, data), iterations, warmup)
+    return results, None
+
+def format_time(t):
+    for unit, scale in (('s', 1), ('ms', 1e3), ('us', 1e6)):
+        if t >= 1 / scale:
+            return f'{t * scale:.3f} {unit}'
+    return f'{t * 1e9:.0f} ns'
+
+def print_bench(day, results):
+    print(f'Day {day}:')
+    for name, r in results.items():
+        print(f'  {name:7} min {format_time(r["min"]):>11}  median {format_time(r["median"]):>11}  '
+              f'p95 {format_time(r["p95"]):>11}  peak mem {r["peak_mem"] / 1024:,.1f} KiB')
+
+def compare_bench(results, baseline, threshold):
+    # flag anything whose median got slower than the baseline by more than threshold percent
+    regressions = []
+    for day, parts in results.items():
+        for name, r in parts.items():
+            if (old := baseline.get(day, {}).get(name)) is None:
+                continue
+            change = (r['median'] - old['median']) / old['median'] * 100 if old['median'] else 0
+            flag = ''
+            if change > threshold:
+                flag = '  REGRESSION'
+                regressions.append(f'day {day} {name}')
+            print(f'Day {day} {name:7} median {format_time(old["median"]):>11} -> '
+                  f'{format_time(r["median"]):>11} ({change:+.1f}%){flag}')
+    if regressions:
+        return f'{len(regressions)} regression(s) past {threshold}%: {", ".join(regressions)}'
+
+def run_bench(days, iterations, warmup, output, compare, threshold):
+    import json
+    if iterations < 1:
+        return 'bench iterations must be at least 1'
+    baseline = None
+    if compare is not None:
+        try:
+            with open(compare) as fp:
+                baseline = json.load(fp)['results']
+        except (OSError, ValueError, KeyError) as e:
+            return f'Error reading baseline {compare}: {e}'
+
+    results = {}
+    for i, day in enumerate(days):
+        if i:
+            print()
+        r, err = bench_day(day, iterations, warmup)
+        if err is not None:
+            return f'Error benchmarking day {day}: {err}'
+        print_bench(day, r)
+        # json object keys are always strings, so use them here too so baseline lookups match
+        results[str(day)] = r
+
+    if output is not None:
+        try:
+            with open(output, 'w') as fp:
+                json.dump({'iterations': iterations, 'warmup': warmup, 'results': results}, fp, indent=2)
+                fp.write('\n')
+        except OSError as e:
+            return f'Error writing {output}: {e}'
+
+    if baseline is not None:
+        print()
+        return compare_bench(results, baseline, threshold)
+
+# --scale input sizes, and the default number of timed runs for each (fewer than --bench since
+# the big sizes are slow)
+SCALE_SIZES = (100, 1000, 10_000, 100_000)
+SCALE_ITERATIONS = 3
+# sizes up to this are also checked against the day's verify_part_N and check(), which are usually
+# too slow for more. Days can raise it for each part with VERIFY_MAX_N_1 and VERIFY_MAX_N_2.
+SCALE_VERIFY_MAX_SIZE = 100
+
+def scale_day(day, sizes, iterations, warmup, seed):
+    # Bench each stage of a day on inputs from its generate() hook at every size. Returns
+    # (results, error) like bench_day, where results are keyed by "stage n=size" and the parts
+    # also have the repr of their answer. Results are empty if the day has no generate().
+    import random, tempfile
+    try:
+        mod = import_day(day)
+    except ModuleNotFoundError as e:
+        return None, f'unable to import: {e}'
+    if getattr(mod, 'generate', None) is None:
+        return {}, None
+
+    results = {}
+    for n in sizes:
+        # seeded per day and size so that every size's input is the same no matter what else ran
+        raw = data = mod.generate(n, random.Random(f'{seed} {day} {n}'))
+        if getattr(mod, 'GRID_INPUT', False):
+            # like bench_day, time load_grid since that's what real runs use, which needs a file
+            with tempfile.TemporaryDirectory() as tmpdir:
+                grid_filename = os.path.join(tmpdir, f'{day:02}.txt')
+                with open(grid_filename, 'w') as fp:
+                    fp.write(raw)
+                results[f'parse n={n}'] = bench_func(lambda: load_grid(grid_filename), iterations, warmup)
+                data = load_grid(grid_filename)
+        elif getattr(mod, 'parse', None) is not None:
+            results[f'parse n={n}'] = bench_func(lambda: mod.parse(raw), iterations, warmup)
+            data = mod.parse(raw)
+        for part in (1, 2):
+            answers = []
+            r = bench_func(lambda: answers.append(run_part(mod, part, data)), iterations, warmup)
+            if any(a != answers[0] for a in answers):
+                return None, f'part {part} n={n} gave different answers on different runs'
+            verify_max = getattr(mod, f'VERIFY_MAX_N_{part}', SCALE_VERIFY_MAX_SIZE)
+            if n <= verify_max and (func := getattr(mod, f'verify_part_{part}', None)) is not None:
+                with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                    expected = func(raw if getattr(mod, 'VERIFY_RAW_INPUT', False) else data)
+                if expected != answers[0]:
+                    return None, (f'part {part} n={n} verification failed: expected "{expected}", '
+                                  f'got "{answers[0]}"')
+            results[f'part_{part} n={n}'] = dict(r, answer=repr(answers[0]))
+        if n <= SCALE_VERIFY_MAX_SIZE and (check := getattr(mod, 'check', None)) is not None:
+            try:
+                check(data)
+            except AssertionError as e:
+                return None, f'n={n} check failed: {e}'
+    return results, None
+
+def size_list(arg):
+    # argparse type for --sizes
+    return [int(n) for n in arg.split(',')]
+
+def growth(a, b, n_a, n_b):
+    # the exponent k where b/a = (n_b/n_a)^k, so 1 is linear and 2 quadratic
+    if a <= 0 or b <= 0:
+        return float('nan')
+    return math.log(b / a) / math.log(n_b / n_a)
+
+def print_scale(day, results):
+    print(f'Day {day}:')
+    if not results:
+        print('  no generate(), skipping')
+        return
+    # group each stage's sizes together, with the growth since the previous size
+    prev = None
+    for name, r in sorted(results.items(), key=lambda kv: (kv[0].split(' n=')[0], int(kv[0].split(' n=')[1]))):
+        stage, n = name.split(' n=')
+        n = int(n)
+        line = (f'  {stage:7} n={n:<9} median {format_time(r["median"]):>11}  '
+                f'peak mem {r["peak_mem"] / 1024:>12,.1f} KiB')
+        if prev is not None and prev[0] == stage:
+            _, prev_n, prev_r = prev
+            line += (f'  time ~n^{growth(prev_r["median"], r["median"], prev_n, n):.2f}'
+                     f'  mem ~n^{growth(prev_r["peak_mem"], r["peak_mem"], prev_n, n):.2f}')
+        print(line)
+        prev = (stage, n, r)
+
+def compare_answers(results, baseline):
+    # every answer which doesn't match the baseline, which must have used the same seed
+    changed = []
+    for day, stages in results.items():
+        for name, r in stages.items():
+            old = baseline.get(day, {}).get(name, {}).get('answer')
+            if old is not None and r.get('answer') != old:
+                print(f'Day {day} {name} answer changed: {old} -> {r["answer"]}')
+                changed.append(f'day {day} {name}')
+    return changed
+
+def run_scale(days, sizes, iterations, warmup, seed, output, compare, threshold):
+    # Like run_bench, but on generated inputs of increasing size. Comparing to a baseline from
+    # the same seed also checks that every answer is unchanged.
+    import json
+    if iterations < 1:
+        return 'bench iterations must be at least 1'
+    if any(n < 1 for n in sizes):
+        return 'scale sizes must be at least 1'
+    baseline = None
+    if compare is not None:
+        try:
+            with open(compare) as fp:
+                baseline = json.load(fp)
+            baseline_results = baseline['results']
+        except (OSError, ValueError, KeyError) as e:
+            return f'Error reading baseline {compare}: {e}'
+
+    results = {}
+    for i, day in enumerate(days):
+        if i:
+            print()
+        r, err = scale_day(day, sizes, iterations, warmup, seed)
+        if err is not None:
+            return f'Error scaling day {day}: {err}'
+        print_scale(day, r)
+        results[str(day)] = r
+
+    if output is not None:
+        try:
+            with open(output, 'w') as fp:
+                json.dump({'iterations': iterations, 'warmup': warmup, 'seed': seed, 'results': results},
+                          fp, indent=2)
+                fp.write('\n')
+        except OSError as e:
+            return f'Error writing {output}: {e}'
+
+    if baseline is not None:
+        print()
+        errors = []
+        if baseline.get('seed') == seed:
+            if changed := compare_answers(results, baseline_results):
+                errors.append(f'{len(changed)} changed answer(s): {", ".join(changed)}')
+        else:
+            print(f'Baseline used seed {baseline.get("seed")}, not comparing answers')
+        if (err := compare_bench(results, baseline_results, threshold)) is not None:
+            errors.append(err)
+        if errors:
+            return '\n'.join(errors)
+
+# --startup-report runs each measurement this many times and keeps the fastest
+STARTUP_RUNS = 5
+# number of the heaviest imports listed for aoc.py and each day
+STARTUP_TOP = 3
+
+def run_importtime(code):
+    # Run code in a fresh interpreter under -X importtime, returning its wall time and its imports
+    # as a list of top level (name, cumulative seconds, children) trees.
+    import collections
+    import subprocess
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError((proc.stderr.strip().splitlines() or ['failed'])[-1])
+
+    # a module's line comes after those of everything it imported, which are indented one more
+    # level, so collect each level's modules until their parent shows up
+    pending = collections.defaultdict(list)
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        try:
+            _, cumulative, name = line[len('import time:'):].split('|')
+            cumulative = int(cumulative) / 1e6
+        except ValueError:
+            # the header line
+            continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        pending[depth].append((name.strip(), cumulative, pending.pop(depth + 1, [])))
+    return wall, pending[0]
+
+def fastest_importtime(code):
+    return min((run_importtime(code) for _ in range(STARTUP_RUNS)), key=lambda r: r[0])
+
+def format_imports(tree, name):
+    # cumulative import time of name (a top level import in tree) and its heaviest imports
+    total, children = next((t, c) for n, t, c in tree if n == name)
+    heaviest = sorted(children, key=lambda c: c[1], reverse=True)[:STARTUP_TOP]
+    return f'{format_time(total):>11}   ' + ', '.join(f'{n} {format_time(t)}' for n, t, _ in heaviest)
+
+def startup_report(days):
+    # How long a single-day run spends before it gets to the puzzle: starting the interpreter,
+    # importing aoc.py, and importing the day module (including anything it imports that aoc.py
+    # didn't already). Cold start is the wall time of the whole process for that day's import.
+    try:
+        base, _ = fastest_importtime('pass')
+        wall, tree = fastest_importtime('import aoc')
+    except (OSError, RuntimeError) as e:
+        return f'Error measuring startup: {e}'
+    if sys.dont_write_bytecode:
+        print('Note: bytecode caching is off (PYTHONDONTWRITEBYTECODE), so import times include compiling')
+    print(f'Interpreter startup {format_time(base):>11}')
+    print(f'aoc.py imports      {format_imports(tree, "aoc")}')
+    print(f'aoc.py cold start   {format_time(wall):>11}')
+    for day in days:
+        name = f'day-{day:02}'
+        try:
+            # importlib.import_module doesn't show up in -X importtime, but __import__ does
+            wall, tree = fastest_importtime(f'import aoc; __import__({name!r})')
+        except (OSError, RuntimeError) as e:
+            return f'Error measuring day {day}: {e}'
+        print(f'Day {day:2} imports     {format_imports(tree, name)}')
+        print(f'Day {day:2} cold start  {format_time(wall):>11}')
+
+# the logging module's levels, so that picking one doesn't mean importing it
+LOG_DEBUG = 10
+LOG_INFO = 20
+LOG_WARNING = 30
+# level for the days' diagnostics
+LOG_LEVEL = LOG_INFO
+PRINT_HANDLER = None
+
+def print_handler():
+    # A handler which logs to whatever sys.stdout is at the time, so that diagnostics stay in
+    # order with the rest of the output and get captured along with it by run_day_part_captured
+    # and bench_func. Created on first use since it needs logging.
+    global PRINT_HANDLER
+    if PRINT_HANDLER is None:
+        import logging
+        class PrintHandler(logging.Handler):
+            def emit(self, record):
+                try:
+                    print(self.format(record))
+                except Exception:
+                    self.handleError(record)
+        PRINT_HANDLER = PrintHandler()
+    return PRINT_HANDLER
+
+def setup_logging(level=None):
+    # Importing logging is a good part of a cold start, and only the days which log need it. So
+    # if nothing has imported it yet this only remembers the level, and import_day calls this
+    # again after importing each day to set it up once one of them has.
+    global LOG_LEVEL
+    if level is not None:
+        LOG_LEVEL = level
+    if 'logging' not in sys.modules:
+        return
+    import logging
+    root = logging.getLogger()
+    root.setLevel(LOG_LEVEL)
+    if print_handler() not in root.handlers:
+        root.addHandler(print_handler())
+
+def import_day(day):
+    mod = importlib.import_module(f'day-{day:02}')
+    # the day may have just imported logging
+    setup_logging()
+    return mod
+
+def init_worker(log_level, profile_mode, profile_top, use_result_cache):
+    setup_logging(log_level)
+    setup_profiling(profile_mode, profile_top)
+    setup_result_cache(use_result_cache)
+
+def run_days(days, test, verify=False, stream=False):
     for i, day in enumerate(days):
         if i:
             print()
         print(f'Day {day}:')
-        if (err := run_day(day, test)) is not None:
+        if (err := run_day(day, test, verify=verify, stream=stream)) is not None:
             return f'Error running day {day}: {err}'
 
-def main():
+def run_day_part_captured(day, part, test, verify, stream):
+    # process pool worker: run a single part and hand back everything it printed so the parent
+    # can replay it in order.
+    buf = io.StringIO()
+    with contextlib.redirect_stdout(buf):
+        err = run_day(day, test, parts=(part,), verify=verify, stream=stream)
+    return buf.getvalue(), err
+
+def run_days_parallel(days, test, jobs, verify=False, stream=False):
+    # Same output and error behavior as run_days, but every day and part runs in its own worker.
+    # Results are printed in day order as they become available, and the first error (in day
+    # order) cancels everything that hasn't started yet.
+    # jobs is the number of workers, or 0 for one per CPU.
+    if jobs < 0:
+        return 'jobs must be at least 0'
+    jobs = jobs or os.cpu_count()
+    # workers might not inherit our logging and profiling setup (if they're spawned rather than forked)
+    import concurrent.futures
+    pool = concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=init_worker,
+                                                  initargs=(LOG_LEVEL, PROFILE_MODE,
+                                                            PROFILE_TOP, USE_RESULT_CACHE))
+    try:
+        futures = [(day, [pool.submit(run_day_part_captured, day, part, test, verify, stream)
+                          for part in (1, 2)])
+                   for day in days]
+        for i, (day, parts) in enumerate(futures):
+            if i:
+                print()
+            print(f'Day {day}:')
+            errs = []
+            for future in parts:
+                output, err = future.result()
+                sys.stdout.write(output)
+                errs.append(err)
+            # when running tests each part reports separately, but the day only fails once
+            if (err := next((e for e in errs if e is not None), None)) is not None:
+                return f'Error running day {day}: {err}'
+    finally:
+        # on error this only waits for the parts which already started
+        pool.shutdown(cancel_futures=True)
+
+# unix socket used by --serve and --client
+SOCKET_PATH = os.environ.get('AOC_SOCKET', '.aoc.sock')
+# set while handling --serve requests
+SERVING = False
+
+class ServerShutdown(BaseException):
+    # Raised by --serve's SIGTERM handler. It's a BaseException like KeyboardInterrupt so that a
+    # request's own error handling (which catches Exception, and SystemExit from argparse) can't
+    # swallow it and keep the server running.
+    pass
+
+def raise_shutdown(signum, frame):
+    raise ServerShutdown()
+
+class SocketWriter(io.TextIOBase):
+    # file-like object that sends everything written to it to a --client as {kind: text} JSON lines
+    def __init__(self, fp, kind):
+        self.fp = fp
+        self.kind = kind
+
+    def writable(self):
+        return True
+
+    def write(self, s):
+        import json
+        self.fp.write(json.dumps({self.kind: s}).encode() + b'\n')
+        self.fp.flush()
+        return len(s)
+
+def reload_changed_days(mtimes):
+    # reload every imported day module whose source changed since we last looked. mtimes is
+    # module name -> source mtime as of the last import/reload
+    for name, mod in list(sys.modules.items()):
+        if not name.startswith('day-') or getattr(mod, '__file__', None) is None:
+            continue
+        try:
+            mtime = os.stat(mod.__file__).st_mtime_ns
+        except OSError:
+            continue
+        if name in mtimes and mtimes[name] != mtime:
+            print(f'Reloading {name}')
+            importlib.reload(mod)
+        mtimes[name] = mtime
+
+def handle_request(conn, mtimes):
+    import json
+    import traceback
+    with conn.makefile('rwb') as fp:
+        try:
+            argv = json.loads(fp.readline())['argv']
+        except (ValueError, KeyError, TypeError):
+            return
+        reload_changed_days(mtimes)
+        out = SocketWriter(fp, 'out')
+        err = SocketWriter(fp, 'err')
+        try:
+            with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+                try:
+                    code = main(argv)
+                except SystemExit as e:
+                    # argparse errors and --help
+                    code = e.code
+                except Exception:
+                    traceback.print_exc()
+                    code = 1
+            fp.write(json.dumps({'exit': code}).encode() + b'\n')
+        except OSError:
+            # client went away, nothing to do about it
+            pass
+
+def serve(path):
+    # Keep a warm process with all the day modules already imported, and run aoc.py commands
+    # sent by --client over a unix socket. Requests are handled one at a time, in our working
+    # directory, and any day module whose source changed is reloaded first (but not aoc.py).
+    global SERVING
+    import glob
+    import signal
+    import socket
+
+    mtimes = {}
+    for filename in sorted(glob.glob('day-*.py')):
+        importlib.import_module(os.path.splitext(filename)[0])
+    reload_changed_days(mtimes)
+
+    if os.path.exists(path):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            try:
+                s.connect(path)
+                return f'a server is already running at {path}'
+            except OSError:
+                # stale socket from a server that didn't clean up
+                os.unlink(path)
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as srv:
+        srv.bind(path)
+        srv.listen()
+        print(f'Serving on {path} with {len(mtimes)} days loaded')
+        SERVING = True
+        # exit cleanly (removing the socket) on SIGTERM too, not just ctrl-C
+        signal.signal(signal.SIGTERM, raise_shutdown)
+        try:
+            while True:
+                conn, _ = srv.accept()
+                with conn:
+                    try:
+                        handle_request(conn, mtimes)
+                    except OSError as e:
+                        # the client disconnecting shouldn't take the server down
+                        print(f'Error handling request: {e}')
+        except (KeyboardInterrupt, ServerShutdown):
+            pass
+        finally:
+            SERVING = False
+            os.unlink(path)
+
+def run_client(path, argv):
+    # forward our arguments to a --serve process and relay its output
+    import json
+    import socket
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        try:
+            s.connect(path)
+        except OSError as e:
+            return f'Unable to connect to server at {path}: {e}'
+        with s.makefile('rwb') as fp:
+            fp.write(json.dumps({'argv': argv}).encode() + b'\n')
+            fp.flush()
+            for line in fp:
+                msg = json.loads(line)
+                if 'out' in msg:
+                    sys.stdout.write(msg['out'])
+                    sys.stdout.flush()
+                elif 'err' in msg:
+                    sys.stderr.write(msg['err'])
+                elif 'exit' in msg:
+                    return msg['exit']
+    return 'server closed the connection'
+
+def all_days():
+    import glob
+    return sorted(int(filename[4:6]) for filename in glob.glob('day-[0-9][0-9].py'))
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    # handled before argparse so the client does as little as possible
+    if argv[:1] == ['--client']:
+        # a server can't be its own client, it would wait forever for itself to accept
+        return 'already serving' if SERVING else run_client(SOCKET_PATH, argv[1:])
+    # likewise for plain "aoc.py [-t] DAY...", which doesn't need argparse
+    test = argv[:1] == ['-t']
+    if argv[test:] and all(arg.isdigit() for arg in argv[test:]):
+        setup_logging(LOG_INFO)
+        setup_profiling(None, PROFILE_TOP)
+        setup_result_cache(True)
+        return run_days([int(arg) for arg in argv[test:]], test)
+
+    import argparse
     parser = argparse.ArgumentParser()
     parser.add_argument('-n', '--new', action='store_true', help='create a new day template')
     parser.add_argument('-d', '--download', action='store_true',
-                        help='download input data (store session cookie in ~/.config/aoc-session-cookie)')
+                        help='download missing input data from $AOC_URL '
+                             '(store session cookie in ~/.config/aoc-session-cookie)')
     parser.add_argument('-t', '--test', action='store_true', help='run test case')
-    parser.add_argument('days', nargs='+', type=int, metavar='DAY', help='day number')
-    args = parser.parse_args()
+    parser.add_argument('--verify', action='store_true',
+                        help="cross-check answers against the day's verify_part_N reference implementation, "
+                             "and run its check() of its engines against each other")
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument('-q', '--quiet', action='store_const', dest='log_level', const=LOG_WARNING,
+                           default=LOG_INFO, help="hide the days' diagnostic output")
+    verbosity.add_argument('-v', '--verbose', action='store_const', dest='log_level', const=LOG_DEBUG,
+                           help="show the days' detailed (per line/step) diagnostic output")
+    parser.add_argument('--no-cache', action='store_true',
+                        help=f'recompute answers rather than using the ones cached in {RESULT_CACHE_DIR}/ '
+                             "(cached answers don't show the days' diagnostic output)")
+    parser.add_argument('-s', '--stream', action='store_true',
+                        help="read input lazily line by line for the parts in a day's STREAM_PARTS")
+    parser.add_argument('-p', '--profile', choices=PROFILERS,
+                        help=f'profile each part, writing results under {PROFILE_DIR}/')
+    parser.add_argument('--profile-top', type=int, default=20, metavar='N',
+                        help='number of hotspots to show in the profile summary (default 20)')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='run days and parts in parallel with this many processes (0 = CPU count)')
+    parser.add_argument('-b', '--bench', action='store_true',
+                        help='benchmark each part instead of printing results')
+    parser.add_argument('-N', '--iterations', type=int,
+                        help=f'bench iterations (default 10, {SCALE_ITERATIONS} for --scale)')
+    parser.add_argument('-w', '--warmup', type=int, default=1, help='bench warmup runs (default 1)')
+    parser.add_argument('-o', '--bench-output', metavar='FILE', help='write bench or scale results as JSON to FILE')
+    parser.add_argument('-c', '--compare', metavar='FILE', help='compare bench or scale results to a JSON baseline')
+    parser.add_argument('--scale', action='store_true',
+                        help="bench each part on generated inputs of increasing size, using each day's "
+                             'generate() (default all days)')
+    parser.add_argument('--sizes', type=size_list, default=SCALE_SIZES,
+                        help=f'comma separated input sizes for --scale (default {",".join(map(str, SCALE_SIZES))})')
+    parser.add_argument('--seed', type=int, default=0, help='random seed for --scale inputs (default 0)')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='percent slowdown vs. baseline that counts as a regression (default 10)')
+    parser.add_argument('--serve', action='store_true',
+                        help=f'keep running and handle commands from --client on {SOCKET_PATH} ($AOC_SOCKET)')
+    parser.add_argument('--client', action='store_true',
+                        help='send the rest of the command line to a running --serve process (must come first)')
+    parser.add_argument('--startup-report', action='store_true',
+                        help='measure interpreter startup and import time for each day (default all days)')
+    parser.add_argument('days', nargs='*', type=int, metavar='DAY', help='day number')
+    args = parser.parse_args(argv)
+    if args.serve:
+        return 'already serving' if SERVING else serve(SOCKET_PATH)
+    if args.startup_report:
+        return startup_report(args.days or all_days())
+    if args.scale and not args.days:
+        args.days = all_days()
+    if not args.days:
+        parser.error('the following arguments are required: DAY')
+    setup_logging(args.log_level)
+    setup_profiling(args.profile, args.profile_top)
+    # profiling and -v are for watching the parts run, so they need to actually run
+    setup_result_cache(not (args.no_cache or args.profile or args.log_level == LOG_DEBUG))
 
     if args.new or args.download:
         err = []
@@ -144,8 +1309,18 @@ def main():
             err.append(e)
         if err:
             return '\n'.join(err)
+    elif args.scale:
+        iterations = SCALE_ITERATIONS if args.iterations is None else args.iterations
+        return run_scale(args.days, args.sizes, iterations, args.warmup, args.seed, args.bench_output,
+                         args.compare, args.threshold)
+    elif args.bench:
+        iterations = 10 if args.iterations is None else args.iterations
+        return run_bench(args.days, iterations, args.warmup, args.bench_output, args.compare,
+                         args.threshold)
+    elif args.jobs != 1:
+        return run_days_parallel(args.days, args.test, args.jobs, args.verify, args.stream)
     else:
-        return run_days(args.days, args.test)
+        return run_days(args.days, args.test, args.verify, args.stream)
 
 if __name__ == '__main__':
     sys.exit(main())
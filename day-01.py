@@ -1,20 +1,53 @@
 # Advent of Code 2021
 # Day 1
 
-import itertools, re
-from dataclasses import dataclass
-from pprint import pprint
+from collections import deque
+from lazy_numpy import import_numpy
 
-def part_1(data):
-    d = [int(n) for n in data.splitlines()]
+def parse(data):
+    return [int(n) for n in data.splitlines()]
+
+def parse_lines(lines):
+    return (int(n) for n in lines)
+
+# lists at least this long use numpy, if it's available
+NUMPY_MIN_LEN = 1_000_000
+
+def count_increases(d, k=1):
+    # Count how many sliding windows of k measurements have a bigger sum than the window before
+    # them. Consecutive windows share all but their first and last values, so that's the same as
+    # checking d[i+k] > d[i] and we never need to add anything up. d can be a list or a stream.
+    if k < 1:
+        raise ValueError(f'window size must be at least 1, got {k}')
+    if isinstance(d, list) and len(d) >= NUMPY_MIN_LEN and (np := import_numpy()) is not None:
+        arr = np.array(d, dtype=np.int64)
+        return int(np.count_nonzero(arr[k:] > arr[:-k]))
+    # stream version, only keep the last k values
+    window = deque(maxlen=k)
+    incs = 0
+    for n in d:
+        if len(window) == k and n > window[0]:
+            incs += 1
+        window.append(n)
+    return incs
+
+def part_1(d):
+    return count_increases(d, 1)
+
+def part_2(d):
+    return count_increases(d, 3)
+
+STREAM_PARTS = (1, 2)
+
+def verify_part_1(d):
     incs = 0
     for i in range(1, len(d)):
         if d[i] > d[i-1]:
             incs += 1
     return incs
 
-def part_2(data):
-    d = [int(n) for n in data.splitlines()]
+def verify_part_2(d):
+    # actually add up the windows
     incs = 0
     for i in range(len(d)-3):
         now = sum(d[i:i+3])
@@ -23,6 +56,17 @@ def part_2(data):
             incs += 1
     return incs
 
+VERIFY_MAX_N_1 = VERIFY_MAX_N_2 = 1_000_000
+
+def generate(n, rng):
+    # n depths that mostly get deeper, with some noise
+    depth = rng.randrange(100, 200)
+    depths = []
+    for _ in range(n):
+        depth = max(0, depth + rng.randint(-10, 20))
+        depths.append(f'{depth}\n')
+    return ''.join(depths)
+
 FORMAT_1 = '{} measurements that increased'
 FORMAT_2 = FORMAT_1
 
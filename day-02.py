@@ -1,11 +1,168 @@
 # Advent of Code 2021
 # Day 2
 
-import itertools, re
-from dataclasses import dataclass
-from pprint import pprint
+import functools, itertools, os
+from lazy_numpy import import_numpy
 
-def part_1(data):
+# Every command is an update of (horiz, depth, aim), and a whole run of commands starting from
+# (h, d, a) always ends at (h + H, d + D + a*H, a + A) for some (H, D, A) which only depend on
+# the commands themselves. So we summarize chunks of commands into (H, D, A) independently (and
+# in parallel) and then combine them in order, which is associative:
+#   (H1, D1, A1) then (H2, D2, A2) = (H1 + H2, D1 + D2 + A1*H2, A1 + A2)
+# Part 1's depth is just part 2's aim, so one summary answers both parts.
+IDENTITY = (0, 0, 0)
+
+def combine(first, second):
+    h1, d1, a1 = first
+    h2, d2, a2 = second
+    return h1 + h2, d1 + d2 + a1 * h2, a1 + a2
+
+def summarize_python(chunk):
+    # split the whole chunk at once, then it's alternating command/count tokens
+    tokens = chunk.split()
+    if len(tokens) % 2:
+        raise ValueError(tokens[-1])
+    horiz = depth = aim = 0
+    for direction, count in zip(tokens[0::2], tokens[1::2]):
+        count = int(count)
+        if direction == b'forward':
+            horiz += count
+            depth += aim * count
+        elif direction == b'down':
+            aim += count
+        elif direction == b'up':
+            aim -= count
+        else:
+            raise ValueError(direction)
+    return horiz, depth, aim
+
+# summarize_numpy's int64 sums must stay below this
+INT64_LIMIT = 1 << 63
+# each command word, by first letter
+COMMANDS = {ord('f'): b'forward', ord('d'): b'down', ord('u'): b'up'}
+
+def summarize_numpy(chunk):
+    # Scan the raw bytes: find the newlines, tell commands apart by their first letter (then
+    # check the rest of the word), and parse the counts one digit column at a time across every
+    # line at once. Sums use int64 inside a chunk, combine() takes care of the big numbers between
+    # chunks. Anything this doesn't handle exactly (other whitespace than single spaces and \n,
+    # or numbers which could overflow int64) goes to summarize_python instead, which also reports
+    # invalid commands.
+    np = import_numpy()
+    if not chunk.endswith(b'\n'):
+        chunk += b'\n'
+    arr = np.frombuffer(chunk, dtype=np.uint8)
+    ends = np.flatnonzero(arr == ord('\n'))
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    kinds = arr[starts]
+    if not np.isin(kinds, list(COMMANDS)).all():
+        return summarize_python(chunk)
+    spaces = starts + 1
+    for kind, word in COMMANDS.items():
+        word_starts = starts[kinds == kind]
+        spaces[kinds == kind] = word_starts + len(word)
+        # a short line can put these past its newline, but never past the end of the chunk
+        for i in range(1, len(word)):
+            if (arr[np.minimum(word_starts + i, len(arr) - 1)] != word[i]).any():
+                return summarize_python(chunk)
+    ndigits = ends - spaces - 1
+    if (ndigits < 1).any() or (arr[np.minimum(spaces, len(arr) - 1)] != ord(' ')).any():
+        return summarize_python(chunk)
+    # the sum of every count (and so also the aim) has to fit
+    if len(starts) * 10 ** int(ndigits.max()) >= INT64_LIMIT:
+        return summarize_python(chunk)
+
+    counts = np.zeros(len(starts), dtype=np.int64)
+    for i in range(int(ndigits.max())):
+        has = ndigits > i
+        digits = arr[spaces[has] + 1 + i] - np.uint8(ord('0'))
+        if (digits > 9).any():
+            return summarize_python(chunk)
+        counts[has] = counts[has] * 10 + digits
+
+    forward = kinds == ord('f')
+    aim = np.cumsum(np.where(kinds == ord('d'), counts, np.where(kinds == ord('u'), -counts, 0)))
+    horiz = int(counts[forward].sum())
+    # every partial sum of forward * aim is at most horiz * the biggest aim
+    if forward.any() and horiz * int(np.abs(aim[forward]).max()) >= INT64_LIMIT:
+        return summarize_python(chunk)
+    return horiz, int((counts[forward] * aim[forward]).sum()), int(aim[-1]) if len(aim) else 0
+
+# chunks at least this many bytes use summarize_numpy, if numpy is available
+NUMPY_MIN_BYTES = 1 << 20
+
+def summarize_chunk(chunk):
+    if len(chunk) >= NUMPY_MIN_BYTES and import_numpy() is not None:
+        return summarize_numpy(chunk)
+    return summarize_python(chunk)
+
+# chunks are about this many bytes, split at the next newline
+CHUNK_SIZE = 1 << 22
+
+def chunk_bounds(buf, size=None):
+    # (start, end) offsets of newline-aligned chunks of a bytes-like object or mmap
+    size = size or CHUNK_SIZE
+    start = 0
+    while start < len(buf):
+        end = buf.find(b'\n', start + size)
+        end = len(buf) if end < 0 else end + 1
+        yield start, end
+        start = end
+
+def summarize(buf):
+    return functools.reduce(combine, (summarize_chunk(bytes(buf[start:end]))
+                                      for start, end in chunk_bounds(buf)), IDENTITY)
+
+def summarize_file_range(filename, start, end):
+    # process pool worker for summarize_file
+    with open(filename, 'rb') as fp:
+        fp.seek(start)
+        return summarize_chunk(fp.read(end - start))
+
+def summarize_file(filename, jobs=None):
+    # summarize a (huge) command file with each chunk handled by a separate worker process
+    import concurrent.futures, mmap
+    with open(filename, 'rb') as fp, mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        bounds = list(chunk_bounds(mm))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(summarize_file_range, filename, start, end) for start, end in bounds]
+        return functools.reduce(combine, (f.result() for f in futures), IDENTITY)
+
+def parse(data):
+    return summarize(data.encode())
+
+# input files at least this big are summarized by summarize_file's process pool
+PARALLEL_MIN_BYTES = 4 * CHUNK_SIZE
+
+def parse_file(filename):
+    # aoc.py uses this rather than parse() for the real input, so that a big one is split
+    # between processes without ever being read here
+    if os.path.getsize(filename) >= PARALLEL_MIN_BYTES:
+        return summarize_file(filename)
+    with open(filename, 'rb') as fp:
+        return summarize(fp.read())
+
+# lines per chunk for parse_lines
+STREAM_CHUNK_LINES = 1 << 16
+
+def parse_lines(lines):
+    summary = IDENTITY
+    while chunk := list(itertools.islice(lines, STREAM_CHUNK_LINES)):
+        summary = combine(summary, summarize_chunk('\n'.join(chunk).encode()))
+    return summary
+
+def part_1(summary):
+    # without aim, the depth is what part 2 calls aim
+    horiz, _, depth = summary
+    return horiz * depth
+
+def part_2(summary):
+    horiz, depth, _ = summary
+    return horiz * depth
+
+STREAM_PARTS = (1, 2)
+
+def verify_part_1(data):
     horiz = 0
     depth = 0
     for line in data.splitlines():
@@ -21,7 +178,7 @@ def part_1(data):
             raise ValueError(line)
     return horiz * depth
 
-def part_2(data):
+def verify_part_2(data):
     horiz = 0
     depth = 0
     aim = 0
@@ -39,6 +196,22 @@ def part_2(data):
             raise ValueError(line)
     return horiz * depth
 
+# the references go line by line over the raw text, which is cheap enough at any size
+VERIFY_RAW_INPUT = True
+VERIFY_MAX_N_1 = VERIFY_MAX_N_2 = 1_000_000
+
+def generate(n, rng):
+    # n random commands, which never go above the surface
+    aim = 0
+    commands = []
+    for _ in range(n):
+        command, x = rng.choice(('forward', 'down', 'up')), rng.randint(1, 9)
+        if command == 'up' and x > aim:
+            command = 'down'
+        aim += {'forward': 0, 'down': x, 'up': -x}[command]
+        commands.append(f'{command} {x}\n')
+    return ''.join(commands)
+
 FORMAT_1 = 'position height * depth = {}'
 FORMAT_2 = '{}'
 
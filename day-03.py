@@ -1,12 +1,80 @@
 # Advent of Code 2021
 # Day 3
 
-import itertools, re
-from dataclasses import dataclass
-from pprint import pprint
+import logging
+from bisect import bisect_left
+from lazy_numpy import import_numpy
 
-def part_1(data):
+log = logging.getLogger(__name__)
+
+def parse(data):
+    # returns every line as an integer, and the width in bits
     lines = data.splitlines()
+    width = len(lines[0])
+    assert all(len(line) == width for line in lines)
+    return [int(line, 2) for line in lines], width
+
+def to_lines(report):
+    values, width = report
+    return [f'{v:0{width}b}' for v in values]
+
+# at least this many values use numpy, if it's available
+NUMPY_MIN_VALUES = 100_000
+
+def count_ones(values, width):
+    # how many values have each bit set, indexed by bit number (0 = least significant)
+    if width <= 64 and len(values) >= NUMPY_MIN_VALUES and (np := import_numpy()) is not None:
+        arr = np.array(values, dtype=np.uint64)
+        return [int(np.count_nonzero(arr & np.uint64(1 << b))) for b in range(width)]
+    return [sum(v >> b & 1 for v in values) for b in range(width)]
+
+def part_1(report):
+    values, width = report
+    gamma = 0
+    for b, ones in enumerate(count_ones(values, width)):
+        zeros = len(values) - ones
+        if zeros == ones:
+            raise ValueError(f'bit {b} is tied')
+        if ones > zeros:
+            gamma |= 1 << b
+    eps = gamma ^ ((1 << width) - 1)
+    if log.isEnabledFor(logging.INFO):
+        log.info('gamma = %s (%d) eps = %s (%d)', f'{gamma:0{width}b}', gamma, f'{eps:0{width}b}', eps)
+    return gamma * eps
+
+def find_rating(values, width, most_common):
+    # values is sorted, so at each step the candidates left are a contiguous range which all
+    # share the same high bits, and within it the ones with a 0 in the next bit all come before
+    # the ones with a 1. That means one bisect finds both groups.
+    lo, hi = 0, len(values)
+    prefix = 0
+    for b in reversed(range(width)):
+        if hi - lo == 1:
+            break
+        split = bisect_left(values, prefix | (1 << b), lo, hi)
+        zeros = split - lo
+        ones = hi - split
+        if zeros and ones:
+            # ties keep the 1s for the most common (oxygen), and the 0s for the least common (co2)
+            if (ones >= zeros) == most_common:
+                lo = split
+                prefix |= 1 << b
+            else:
+                hi = split
+        elif ones:
+            prefix |= 1 << b
+    return values[lo]
+
+def part_2(report):
+    values, width = report
+    values = sorted(values)
+    o2_rating = find_rating(values, width, True)
+    log.info('o2_rating=%d', o2_rating)
+    co2_rating = find_rating(values, width, False)
+    return o2_rating * co2_rating
+
+def verify_part_1(report):
+    lines = to_lines(report)
     columns = list(zip(*lines))
     gamma = ''
     eps = ''
@@ -24,11 +92,11 @@ def part_1(data):
 
     i_gamma = int(gamma, 2)
     i_eps = int(eps, 2)
-    print(f'gamma = {gamma} ({i_gamma}) eps = {eps} ({i_eps})')
+    log.info('gamma = %s (%d) eps = %s (%d)', gamma, i_gamma, eps, i_eps)
     return i_gamma * i_eps
 
-def part_2(data):
-    lines = data.splitlines()
+def verify_part_2(report):
+    lines = to_lines(report)
     # oxygen rating
     o2_rating = -1
     for col in range(len(lines[0])):
@@ -39,11 +107,11 @@ def part_2(data):
         lines = [line for line in lines if line[col] == most_common]
         if len(lines) == 1:
             o2_rating = int(lines[0], 2)
-            print(f'{o2_rating=}')
+            log.info('o2_rating=%d', o2_rating)
             break
 
     # co2 scrubber rating
-    lines = data.splitlines()
+    lines = to_lines(report)
     co2_rating = -1
     for col in range(len(lines[0])):
         sl = ''.join(line[col] for line in lines)
@@ -58,6 +126,14 @@ def part_2(data):
 
     return o2_rating * co2_rating
 
+VERIFY_MAX_N_1 = VERIFY_MAX_N_2 = 100_000
+
+def generate(n, rng):
+    # Distinct values like the puzzle input, with a couple of spare bits so they aren't every
+    # possible value. There's always an odd number of them so part 1 never has a tied bit.
+    width = max(5, n.bit_length() + 2)
+    return ''.join(f'{v:0{width}b}\n' for v in rng.sample(range(1 << width), n | 1))
+
 FORMAT_1 = 'Power Consumption: {}'
 FORMAT_2 = 'Life Support Rating: {}'
 
@@ -1,18 +1,67 @@
 # Advent of Code 2021
 # Day 4
 
-import itertools, re
-from dataclasses import dataclass
-from pprint import pprint
+import logging
+
+log = logging.getLogger(__name__)
+
+class BingoGame:
+    # All boards are played together. Rather than scanning every board for every number, keep
+    # an index of number -> every (board, row, col) it's on, and count hits per row and column
+    # of each board along with each board's unmarked sum. Each draw then only touches the
+    # boards that actually have that number.
+    def __init__(self, boards):
+        self.index = {}
+        for b, board in enumerate(boards):
+            for r, row in enumerate(board):
+                for c, num in enumerate(row):
+                    self.index.setdefault(num, []).append((b, r, c))
+        self.row_hits = [0] * (5 * len(boards))
+        self.col_hits = [0] * (5 * len(boards))
+        self.unmarked = [sum(sum(row) for row in board) for board in boards]
+        self.won = [False] * len(boards)
+
+    def draw(self, num):
+        # mark num on every board and return the list of boards which won because of it
+        winners = []
+        # pop so that a repeated number doesn't get marked twice
+        for b, r, c in self.index.pop(num, ()):
+            if self.won[b]:
+                continue
+            self.unmarked[b] -= num
+            self.row_hits[5*b + r] += 1
+            self.col_hits[5*b + c] += 1
+            if self.row_hits[5*b + r] == 5 or self.col_hits[5*b + c] == 5:
+                self.won[b] = True
+                winners.append(b)
+        return winners
+
+    def play(self, numbers):
+        # numbers can be any iterable, including a stream. Yields (number, board, score) for
+        # each board as it wins, in order, where score is the sum of its unmarked numbers
+        for num in numbers:
+            for b in self.draw(num):
+                yield num, b, self.unmarked[b]
+
+
+def parse(data):
+    # returns the called numbers and a list of boards as 5x5 lists of ints
+    lines = data.splitlines()
+    numbers = [int(x.strip()) for x in lines[0].split(',')]
+    boardlines = [line for line in lines[1:] if line]
+    assert len(boardlines) % 5 == 0 and len(boardlines) > 0
+    rows = []
+    for line in boardlines:
+        r = [int(x) for x in line.split()]
+        assert len(r) == 5
+        rows.append(r)
+    boards = [rows[i:i+5] for i in range(0, len(rows), 5)]
+    return numbers, boards
 
 class BingoBoard:
+    # The straightforward version, one board at a time, for checking BingoGame against
     def __init__(self, rows):
-        self.d = []
-        for row in rows:
-            r = [int(x) for x in row.split()]
-            assert len(r) == 5
-            self.d.append(r)
-        assert len(self.d) == 5
+        self.d = rows
         # don't use [[False]*5]*5] because then all rows would be
         # the same list object. Using comprehension makes new lists
         self.m = [[False]*5 for _ in range(5)]
@@ -36,26 +85,32 @@ class BingoBoard:
         return s
 
 
-def load_data(data):
-    lines = data.splitlines()
-    numbers = [int(x.strip()) for x in lines[0].split(',')]
-    boardlines = [line for line in lines[1:] if line]
-    assert len(boardlines) % 5 == 0 and len(boardlines) > 0
-    boards = [BingoBoard(boardlines[i:i+5]) for i in range(0, len(boardlines), 5)]
-    return numbers, boards
-
 def part_1(data):
-    numbers, boards = load_data(data)
+    numbers, boards = data
+    for num, _, bscore in BingoGame(boards).play(numbers):
+        log.debug('winning board found with score %d after number %d', bscore, num)
+        return bscore * num
+
+def part_2(data):
+    numbers, boards = data
+    last = None
+    for num, _, bscore in BingoGame(boards).play(numbers):
+        log.debug('winning board found with score %d after number %d', bscore, num)
+        last = bscore * num
+    return last
+
+def verify_part_1(data):
+    numbers, rows = data
+    boards = [BingoBoard(board) for board in rows]
     for num in numbers:
         for board in boards:
             board.mark(num)
             if board.is_win():
-                bscore = board.score()
-                print(f'winning board found with score {bscore} after number {num}')
-                return bscore * num
+                return board.score() * num
 
-def part_2(data):
-    numbers, boards = load_data(data)
+def verify_part_2(data):
+    numbers, rows = data
+    boards = [BingoBoard(board) for board in rows]
     win_boards = []
     win_scores = []
 
@@ -63,13 +118,22 @@ def part_2(data):
         for board in boards:
             board.mark(num)
             if board.is_win() and board not in win_boards:
-                bscore = board.score()
-                print(f'winning board found with score {bscore} after number {num}')
                 win_boards.append(board)
-                win_scores.append(bscore * num)
+                win_scores.append(board.score() * num)
 
     return win_scores[-1]
 
+VERIFY_MAX_N_1 = VERIFY_MAX_N_2 = 1000
+
+def generate(n, rng):
+    # n boards of 25 numbers from 0-99, and every one of those numbers is drawn so every board
+    # wins eventually
+    blocks = [','.join(str(x) for x in rng.sample(range(100), 100))]
+    for _ in range(n):
+        board = rng.sample(range(100), 25)
+        blocks.append('\n'.join(' '.join(f'{x:2}' for x in board[r:r+5]) for r in range(0, 25, 5)))
+    return '\n\n'.join(blocks) + '\n'
+
 FORMAT_1 = '{}'
 FORMAT_2 = '{}'
 
@@ -1,24 +1,32 @@
 # Advent of Code 2021
 # Day 5
 
-import itertools, re
-from dataclasses import dataclass
-from pprint import pprint
+import re
+from collections import namedtuple
+from lazy_numpy import import_numpy
 
-@dataclass
-class Point:
-    x: int
-    y: int
+Point = namedtuple('Point', 'x y')
 
-def load_lines(data):
-    lines = []
-    for tline in data.splitlines():
-        m = re.match(r'(\d+),(\d+) -> (\d+),(\d+)', tline)
+LINE_RE = re.compile(r'(\d+),(\d+) -> (\d+),(\d+)')
+
+def iter_lines(fp):
+    # yield segments one at a time from any iterable of text lines (such as an open file), so
+    # the input never has to be held in memory all at once
+    for tline in fp:
+        if not (tline := tline.rstrip('\n')):
+            continue
+        m = LINE_RE.match(tline)
         if m is None:
             raise ValueError(tline)
         x1, y1, x2, y2 = (int(x) for x in m.groups())
-        lines.append((Point(x1, y1), Point(x2, y2)))
-    return lines
+        yield Point(x1, y1), Point(x2, y2)
+
+def parse(data):
+    return list(iter_lines(data.splitlines()))
+
+def parse_lines(lines):
+    # with --stream, the parts read the segments straight from the file
+    return iter_lines(lines)
 
 def grid_size(lines):
     max_x = max(max(l[0].x, l[1].x) for l in lines)
@@ -34,8 +42,7 @@ def print_grid(grid):
                 print(cell, end='')
         print()
 
-def run(data, include_diagonal):
-    lines = load_lines(data)
+def run_python(lines, include_diagonal):
     width, height = grid_size(lines)
     grid = [[0]*width for _ in range(height)]
     for line in lines:
@@ -69,11 +76,162 @@ def run(data, include_diagonal):
     #print_grid(grid)
     return sum(grid[r][c] >= 2 for r in range(height) for c in range(width))
 
-def part_1(data):
-    return run(data, False)
+# max number of points rasterized at once by run_numpy, bounds the size of the index arrays
+NUMPY_BATCH_POINTS = 1 << 22
+
+def run_numpy(lines, include_diagonal):
+    # Same as run_python, but rasterize whole batches of segments at once. Every segment (all
+    # orientations, diagonals are always 45 degrees) is x1 + dx*t, y1 + dy*t for t in 0..len-1
+    # with dx, dy in {-1, 0, 1}, so we can build the flat grid indexes for every point of every
+    # segment in the batch with np.repeat/arange and no python loops.
+    np = import_numpy()
+    seg = np.array([(a.x, a.y, b.x, b.y) for a, b in lines], dtype=np.int64).reshape(-1, 4)
+    width = int(max(seg[:, 0].max(), seg[:, 2].max())) + 1
+    height = int(max(seg[:, 1].max(), seg[:, 3].max())) + 1
+
+    x1, y1, x2, y2 = seg.T
+    dx = np.sign(x2 - x1)
+    dy = np.sign(y2 - y1)
+    diagonal = (dx != 0) & (dy != 0)
+    assert np.all(np.abs(x2 - x1)[diagonal] == np.abs(y2 - y1)[diagonal])
+    if not include_diagonal:
+        keep = ~diagonal
+        x1, y1, dx, dy = x1[keep], y1[keep], dx[keep], dy[keep]
+        x2, y2 = x2[keep], y2[keep]
+    lengths = np.maximum(np.abs(x2 - x1), np.abs(y2 - y1)) + 1
+    ends = np.cumsum(lengths)
+
+    # the grid only needs to count to 2, so a saturating uint8 keeps 10k*10k grids at 100MB
+    grid = np.zeros(width * height, dtype=np.uint8)
+    i = 0
+    while i < len(lengths):
+        # take as many segments as fit in the batch, but always at least one
+        j = max(i + 1, int(np.searchsorted(ends, ends[i] - lengths[i] + NUMPY_BATCH_POINTS, side='right')))
+        lens = lengths[i:j]
+        seg_idx = np.repeat(np.arange(j - i), lens)
+        t = np.arange(int(lens.sum())) - np.repeat(np.cumsum(lens) - lens, lens)
+        xs = x1[i:j][seg_idx] + dx[i:j][seg_idx] * t
+        ys = y1[i:j][seg_idx] + dy[i:j][seg_idx] * t
+        cells, counts = np.unique(ys * width + xs, return_counts=True)
+        grid[cells] = np.minimum(grid[cells] + np.minimum(counts, 2), 2)
+        i = j
+
+    return int((grid >= 2).sum())
+
+def run_sparse(lines, include_diagonal):
+    # Row-by-row sweep that never allocates the grid, so memory is O(segments) no matter how big
+    # the coordinates are. Every segment covers one x interval per row it touches, starting at
+    # x0 on row y0 and moving by slope each row (0 for horizontal/vertical, +-1 for diagonal).
+    # lines can be any iterable, like iter_lines() on an open file.
+    segs = []
+    for a, b in lines:
+        if a.y > b.y or (a.y == b.y and a.x > b.x):
+            a, b = b, a
+        if a.x != b.x and a.y != b.y:
+            if not include_diagonal:
+                continue
+            assert abs(b.x - a.x) == b.y - a.y
+            segs.append((a.y, b.y, a.x, 1 if b.x > a.x else -1, 0))
+        else:
+            # horizontal is a single row with a wide interval, vertical a single column
+            segs.append((a.y, b.y, a.x, 0, b.x - a.x))
+    segs.sort()
+
+    count = 0
+    active = []
+    i = 0
+    y = 0
+    while i < len(segs) or active:
+        if not active:
+            # skip empty rows
+            y = max(y, segs[i][0])
+        while i < len(segs) and segs[i][0] <= y:
+            active.append(segs[i])
+            i += 1
+
+        # count cells in this row covered by at least two intervals
+        events = []
+        for y0, _, x0, slope, width in active:
+            lo = x0 + slope * (y - y0)
+            events.append((lo, 1))
+            events.append((lo + width + 1, -1))
+        events.sort()
+        depth = 0
+        prev_x = None
+        for x, delta in events:
+            if depth >= 2:
+                count += x - prev_x
+            depth += delta
+            prev_x = x
+
+        active = [seg for seg in active if seg[1] > y]
+        y += 1
+
+    return count
 
-def part_2(data):
-    return run(data, True)
+# Segments covering at least this many points in total use run_numpy, if numpy is available
+NUMPY_MIN_POINTS = 100_000
+# Use run_sparse when the dense grid would have more than this many cells per segment-row swept.
+# A row of the sweep is much slower than a cell of the grid, especially with numpy.
+SPARSE_DENSITY_RATIO = 64
+
+def run(lines, include_diagonal):
+    # lines can be any iterable of segments, such as parse_lines() on the open file, and is only
+    # read once. Every engine needs the segments more than once so they're kept, but everything
+    # used to pick an engine is added up on the way through.
+    segs = []
+    max_x = max_y = points = rows = 0
+    for a, b in lines:
+        if not include_diagonal and a.x != b.x and a.y != b.y:
+            continue
+        segs.append((a, b))
+        max_x = max(max_x, a.x, b.x)
+        max_y = max(max_y, a.y, b.y)
+        points += max(abs(a.x - b.x), abs(a.y - b.y)) + 1
+        rows += abs(a.y - b.y) + 1
+    if not segs:
+        return 0
+
+    # The dense engines cost the area of the grid, run_sparse costs about one interval per row
+    # that each segment touches, so a long horizontal segment is cheap for it no matter how long.
+    if (max_x + 1) * (max_y + 1) > SPARSE_DENSITY_RATIO * rows:
+        return run_sparse(segs, include_diagonal)
+    if points >= NUMPY_MIN_POINTS and import_numpy() is not None:
+        return run_numpy(segs, include_diagonal)
+    return run_python(segs, include_diagonal)
+
+def part_1(lines):
+    return run(lines, False)
+
+def part_2(lines):
+    return run(lines, True)
+
+STREAM_PARTS = (1, 2)
+
+# the plain dense grid is the reference for the numpy and sparse versions
+def verify_part_1(lines):
+    return run_python(lines, False)
+
+def verify_part_2(lines):
+    return run_python(lines, True)
+
+VERIFY_MAX_N_1 = VERIFY_MAX_N_2 = 10_000
+
+def generate(n, rng):
+    # n horizontal, vertical and diagonal segments. The grid grows with sqrt(n) and segments
+    # with the grid, so the average overlap grows slowly rather than every cell being covered.
+    extent = max(10, 10 * int(n ** 0.5))
+    lines = []
+    for _ in range(n):
+        length = rng.randrange(1, max(2, extent // 8))
+        dx, dy = rng.choice(((1, 0), (0, 1), (1, 1), (1, -1)))
+        x1 = rng.randrange(extent - length * dx)
+        y1 = rng.randrange(length, extent) if dy < 0 else rng.randrange(extent - length * dy)
+        ends = [(x1, y1), (x1 + dx * length, y1 + dy * length)]
+        rng.shuffle(ends)
+        (x1, y1), (x2, y2) = ends
+        lines.append(f'{x1},{y1} -> {x2},{y2}\n')
+    return ''.join(lines)
 
 FORMAT_1 = '{}'
 FORMAT_2 = '{}'
@@ -91,5 +249,13 @@ test = '''\
 5,5 -> 8,2
 '''
 
-TEST_CASE_1 = [(test, 5)]
-TEST_CASE_2 = [(test, 12)]
+# a few long segments far apart, which only run_sparse can do without a 300 million cell grid
+sparse_test = '''\
+0,0 -> 300000000,0
+100000000,0 -> 200000000,0
+250000000,5 -> 250000000,0
+299999998,2 -> 300000000,0
+'''
+
+TEST_CASE_1 = [(test, 5), (sparse_test, 100_000_002)]
+TEST_CASE_2 = [(test, 12), (sparse_test, 100_000_003)]
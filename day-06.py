@@ -1,15 +1,88 @@
 # Advent of Code 2021
 # Day 6
 
-import itertools, re
-from dataclasses import dataclass
-from pprint import pprint
+def parse(data):
+    return [int(x) for x in data.split(',')]
 
-def part_1(data):
-    fish = [int(x) for x in data.split(',')]
-    days = 80
+# Exponential growth means it's infeasible to simulate every fish (just storing the final
+# array of the part 2 test case would use over 100GB of RAM). We don't care about any unique
+# fish though, all fish that have the same counter are equivalent, so we only track a 9-element
+# vector of how many fish have each counter value.
+#
+# One day is then a linear map on that vector, with TRANSITION[i][j] being how many fish with
+# counter i tomorrow come from each fish with counter j today:
+#   - new 0-5 are just copies of old 1-6
+#   - new 6 is old 7 plus old 0 (which reset)
+#   - new 7 is old 8
+#   - new 8 are the ones just spawned from old 0
+# and N days is TRANSITION^N, which takes O(log N) matrix multiplies by repeated squaring.
+TRANSITION = [[0]*9 for _ in range(9)]
+for i in range(6):
+    TRANSITION[i][i+1] = 1
+TRANSITION[6][7] = TRANSITION[6][0] = 1
+TRANSITION[7][8] = 1
+TRANSITION[8][0] = 1
 
-    for day in range(1, days+1):
+def mat_mul(a, b, mod=None):
+    res = [[sum(a[i][k] * b[k][j] for k in range(9)) for j in range(9)] for i in range(9)]
+    if mod is not None:
+        res = [[x % mod for x in row] for row in res]
+    return res
+
+def mat_vec(m, v, mod=None):
+    res = [sum(m[i][k] * v[k] for k in range(9)) for i in range(9)]
+    if mod is not None:
+        res = [x % mod for x in res]
+    return res
+
+# mod -> [TRANSITION^1, TRANSITION^2, TRANSITION^4, ...], shared by every query
+SQUARES = {}
+
+def transition_square(k, mod=None):
+    # return TRANSITION^(2^k), computing and caching any missing squares
+    squares = SQUARES.setdefault(mod, [TRANSITION])
+    while len(squares) <= k:
+        squares.append(mat_mul(squares[-1], squares[-1], mod))
+    return squares[k]
+
+def counts_after(counts, days, mod=None):
+    # apply TRANSITION^days to the counts vector one set bit of days at a time. Matrix-vector
+    # products are much cheaper than multiplying the matrices together, and since all powers of
+    # the same matrix commute the order doesn't matter. Integers are unbounded, so if mod is
+    # None the answer is exact no matter how big it gets.
+    if days < 0:
+        # days >>= 1 would never get to 0
+        raise ValueError(f'days must be at least 0, got {days}')
+    k = 0
+    while days:
+        if days & 1:
+            counts = mat_vec(transition_square(k, mod), counts, mod)
+        days >>= 1
+        k += 1
+    return counts
+
+def count_fish(fish, days, mod=None):
+    counts = [0]*9
+    for f in fish:
+        counts[f] += 1
+    total = sum(counts_after(counts, days, mod))
+    return total if mod is None else total % mod
+
+def count_fish_many(fish, horizons, mod=None):
+    # answer lots of different day counts, the squares are only computed once for all of them
+    return {days: count_fish(fish, days, mod) for days in horizons}
+
+def part_1(fish):
+    return count_fish(fish, 80)
+
+def part_2(fish):
+    # exactly the same as part 1, but 256 days
+    return count_fish(fish, 256)
+
+def verify_part_1(fish):
+    # brute force, every fish one at a time
+    fish = list(fish)
+    for day in range(1, 80+1):
         new_fish = 0
         for i in range(len(fish)):
             if fish[i] == 0:
@@ -18,35 +91,31 @@ def part_1(data):
             else:
                 fish[i] -= 1
         fish.extend([8]*new_fish)
-        #if day <= 18:
-        #    print(f'After {day:2} days: {fish}')
-
     return len(fish)
 
-def part_2(data):
-    # exactly the same as part 1, but 256 days and exponential growth means it's infeasible to brute
-    # force (just storing the final resulting array of the test case would use over 100GB of RAM).
-    # So rather than brute force, we use a 9-element array, indexed by the life of the fish; we
-    # don't care about any unique fish, all fish that have the same counter are equivalent.
-    days = 256
-    fish = [0]*9
-    for s in data.split(','):
-        fish[int(s)] += 1
-
-    for day in range(1, days+1):
+def verify_part_2(fish):
+    # one day at a time with the 9-element array
+    counts = [0]*9
+    for f in fish:
+        counts[f] += 1
+
+    for day in range(1, 256+1):
         # just re-create the array, things shift left and new fish are added to slot 8
-        fish = [
-            # new fish 0-5 are just copies of old fish 1-6
-            fish[1], fish[2], fish[3], fish[4], fish[5], fish[6],
-            # new fish 6 is old fish 7 plus old fish 0 (which reset)
-            fish[7] + fish[0],
-            # old fish 8 shifts to 7
-            fish[8],
-            # new fish 8 are the ones just spawned from old 0
-            fish[0],
+        counts = [
+            counts[1], counts[2], counts[3], counts[4], counts[5], counts[6],
+            counts[7] + counts[0],
+            counts[8],
+            counts[0],
         ]
 
-    return sum(fish)
+    return sum(counts)
+
+# part 1's brute force has about 1000 fish for each one it starts with after 80 days
+VERIFY_MAX_N_2 = 100_000
+
+def generate(n, rng):
+    # n fish with timers 1-5, like the puzzle input
+    return ','.join(str(rng.randint(1, 5)) for _ in range(n)) + '\n'
 
 FORMAT_1 = '{}'
 FORMAT_2 = '{}'
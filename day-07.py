@@ -1,12 +1,22 @@
 # Advent of Code 2021
 # Day 7
 
-import itertools, re
-from dataclasses import dataclass
-from pprint import pprint
-from statistics import median
+import logging
 
-def part_1(data):
+log = logging.getLogger(__name__)
+
+def parse(data):
+    return [int(x) for x in data.split(',')]
+
+def part_1(crabs):
+    # The sum of distances from each crab is minimized at the median (see verify_part_1 for how
+    # we got here). With an even number of crabs, anywhere between the two middle crabs is
+    # equally good so the lower one is fine and keeps it an integer.
+    pos = sorted(crabs)[(len(crabs) - 1) // 2]
+    log.info('optimal position is %d', pos)
+    return sum(abs(pos - c) for c in crabs)
+
+def verify_part_1(crabs):
     # Find a value which minimizes the sum of all the distances from each crab to that value.
     # I think this is just the mean/average of all the positions, but I can't mathematically
     # prove that in my head so I'll just O(n^2) brute-force it.
@@ -14,29 +24,51 @@ def part_1(data):
     # After running this code, it appears that the optimal position is definitely not the average,
     # but is instead the median. Some wording on wikipedia seems to confirm that the median is always
     # optimal, but as usual Math Wikipedia is too dense to fully understand.
-    crabs = [int(x) for x in data.split(',')]
+    from statistics import median
     true_min = min((sum(abs(x-c) for c in crabs), x) for x in range(min(crabs), max(crabs)+1))
-    print(f'average crab position is {sum(crabs)/len(crabs)}')
-    print(f'median  crab position is {median(crabs)}')
-    print(f'optimal position is {true_min[1]}')
+    log.info('average crab position is %s', sum(crabs)/len(crabs))
+    log.info('median  crab position is %s', median(crabs))
+    log.info('optimal position is %d', true_min[1])
     return true_min[0]
 
-def part_2(data):
+def triangle(n):
+    # fuel cost for distance N is the Nth triangular number
+    return n * (n + 1) // 2
+
+def fuel_2(crabs, pos):
+    return sum(triangle(abs(pos - c)) for c in crabs)
+
+def part_2(crabs):
     # crabs burn one fuel for the first move, 2 for the second move, and so on.
-    # minimize fuel for this new constraint
-    crabs = [int(x) for x in data.split(',')]
+    # The total fuel sum((d^2 + |d|) / 2) is convex, and setting its derivative to zero shows
+    # the real-valued minimum is within 1/2 of the mean. The best integer position is next to
+    # that, so it's somewhere in [floor(mean - 1/2), ceil(mean + 1/2)] and we only have to try
+    # those 2 or 3 positions. All integer math so it's exact for huge inputs.
+    n = len(crabs)
+    total = sum(crabs)
+    lo = (2 * total - n) // (2 * n)
+    hi = -(-(2 * total + n) // (2 * n))
+    res = min((fuel_2(crabs, pos), pos) for pos in range(lo, hi + 1))
+    log.info('optimal position: %d', res[1])
+    return res[0]
+
+def verify_part_2(crabs):
     # hypothesis: the optimal position is the average. It seems this isn't right due to rounding
     avg_pos = round(sum(crabs) / len(crabs))
-    print(f'average position: {avg_pos}')
-
-    # fuel cost for distance N is the Nth triangular number
-    triangle = lambda n: int((n * (n + 1)) / 2)
+    log.info('average position: %d', avg_pos)
 
     # average didn't work, so just brute-force it again
-    res = min((sum(triangle(abs(pos - c)) for c in crabs), pos) for pos in range(min(crabs), max(crabs)+1))
-    print(f'optimal position: {res[1]}')
+    res = min((fuel_2(crabs, pos), pos) for pos in range(min(crabs), max(crabs)+1))
+    log.info('optimal position: %d', res[1])
     return res[0]
 
+# both references are O(n * range of positions)
+VERIFY_MAX_N_1 = VERIFY_MAX_N_2 = 1000
+
+def generate(n, rng):
+    # n crabs spread over twice as many positions
+    return ','.join(str(rng.randrange(2 * n)) for _ in range(n)) + '\n'
+
 FORMAT_1 = 'Total fuel: {}'
 FORMAT_2 = FORMAT_1
 
@@ -1,10 +1,7 @@
 # Advent of Code 2021
 # Day 8
 
-import itertools, re
-from dataclasses import dataclass
 from itertools import permutations
-from pprint import pprint
 
 #    0:      1:      2:      3:      4:
 #   aaaa            aaaa    aaaa
@@ -25,9 +22,12 @@ from pprint import pprint
 #   gggg    gggg            gggg    gggg
 
 
-def part_1(data):
+def parse(data):
+    return data.splitlines()
+
+def part_1(lines):
     total = 0
-    for line in data.splitlines():
+    for line in lines:
         parts = line.split(' | ')
         assert len(parts) == 2
         total += sum(len(word) in (2, 3, 4, 7) for word in parts[1].split())
@@ -58,14 +58,14 @@ def gen_permutations():
     for perm in permutations('abcdefg'):
         yield ''.join(perm)
 
-def part_2(data):
+def verify_part_2(lines):
     # ok here's the hard part we actually have to figure out which letters map to which segments.
     # There's probably a clever way to iteratively remove possibilities until only one possible
     # mapping remains, but I can't think of an algorithm for that.
     # On the other hand, there's only 7! = 5040 possible arrangements of the segment mappings,
     # so we can just brute-force it and see what works.
     outputs = []
-    for line in data.splitlines():
+    for line in lines:
         parts = line.split(' | ')
         assert len(parts) == 2
         inwords = [sort_word(word) for word in parts[0].split()]
@@ -88,6 +88,54 @@ def part_2(data):
 
     return sum(outputs)
 
+# The clever way after all: across the 10 input patterns, each segment is lit a fixed number of
+# times no matter how the wires are scrambled (a=8, b=6, c=8, d=7, e=4, f=9, g=7). Add up those
+# counts for the segments in a digit and every digit gets a different total, so we can decode an
+# output word by summing how often each of its letters shows up in the inputs, without ever
+# working out the actual wiring.
+DIGIT_SEGMENTS = valid_digits_in_perm('abcdefg')
+SEGMENT_COUNTS = {seg: sum(seg in digit for digit in DIGIT_SEGMENTS) for seg in 'abcdefg'}
+DIGIT_BY_SCORE = {sum(SEGMENT_COUNTS[seg] for seg in digit): i for i, digit in enumerate(DIGIT_SEGMENTS)}
+assert len(DIGIT_BY_SCORE) == 10
+
+def decode_line(line):
+    inpart, sep, outpart = line.partition(' | ')
+    assert sep
+    counts = {c: inpart.count(c) for c in 'abcdefg'}
+    value = 0
+    for word in outpart.split():
+        score = sum(counts[c] for c in word)
+        if (digit := DIGIT_BY_SCORE.get(score)) is None:
+            raise ValueError(f'no matching digit for {word=} in {line=}')
+        value = value * 10 + digit
+    return value
+
+def part_2(lines):
+    return sum(decode_line(line) for line in lines)
+
+def verify_part_1(lines):
+    # decode every output rather than going by word length
+    return sum(str(decode_line(line)).zfill(4).count(d) for line in lines for d in '1478')
+
+VERIFY_MAX_N_1 = 100_000
+
+
+STREAM_PARTS = (1, 2)
+
+def generate(n, rng):
+    # n displays, each with its own random wiring, all ten digits in a random order and four
+    # random output digits. The letters in every pattern are shuffled too.
+    lines = []
+    for _ in range(n):
+        wiring = dict(zip('abcdefg', rng.sample('abcdefg', 7)))
+        def scramble(digit):
+            segments = [wiring[c] for c in DIGIT_SEGMENTS[digit]]
+            rng.shuffle(segments)
+            return ''.join(segments)
+        patterns = ' '.join(scramble(d) for d in rng.sample(range(10), 10))
+        output = ' '.join(scramble(rng.randrange(10)) for _ in range(4))
+        lines.append(f'{patterns} | {output}\n')
+    return ''.join(lines)
 
 FORMAT_1 = 'Times that digits 1, 4, 7, or 8 appear: {}'
 FORMAT_2 = 'Sum of all outputs: {}'
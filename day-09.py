@@ -1,18 +1,27 @@
 # Advent of Code 2021
 # Day 9
 
-import itertools, re
-from dataclasses import dataclass
+import itertools
+from array import array
+from collections import deque
 from functools import reduce
-from pprint import pprint
 
-def load_grid(data):
-    grid = []
-    for line in data.splitlines():
-        grid.append([int(c) for c in line])
+def parse(data):
+    # returns the heights as a flat bytes object (one byte per cell, row-major) and its size
+    lines = data.splitlines()
+    rows = len(lines)
+    cols = len(lines[0])
+    assert all(len(line) == cols for line in lines)
+    # translate digits to values 0-9 in one go rather than int() for every character
+    heights = ''.join(lines).encode().translate(DIGIT_VALUES)
+    return heights, rows, cols
 
-    assert all(len(row) == len(grid[0]) for row in grid)
-    return grid
+DIGIT_VALUES = bytes.maketrans(b'0123456789', bytes(range(10)))
+
+def to_grid(heightmap):
+    # nested list of lists version of the heightmap, which the verify functions use
+    heights, rows, cols = heightmap
+    return [list(heights[r*cols:(r+1)*cols]) for r in range(rows)]
 
 def neighbors(grid, r, c):
     n = []
@@ -38,10 +47,10 @@ def get_low_points(grid):
 
     return points
 
-def part_1(data):
+def verify_part_1(heightmap):
     # low points are squares in the grid where its value is lower than any ortho-adjacent neighbors
     # the risk level is 1 plus its value, find the sum of all risk levels
-    grid = load_grid(data)
+    grid = to_grid(heightmap)
     low_points = get_low_points(grid)
     return sum(grid[r][c] + 1 for r, c in low_points)
 
@@ -57,9 +66,9 @@ def expand_basin(grid, basin):
     else:
         return False
 
-def part_2(data):
+def verify_part_2(heightmap):
     # find the basins, and return the product of the sizes of the 3 largest basins
-    grid = load_grid(data)
+    grid = to_grid(heightmap)
     low_points = get_low_points(grid)
     basins = [[p] for p in low_points]
     for basin in basins:
@@ -70,6 +79,127 @@ def part_2(data):
     #pprint(basins)
     return reduce(lambda acc, b: acc * len(b), basins[:3], 1)
 
+def part_1(heightmap):
+    # same as verify_part_1, but index the flat heights directly instead of building lists of
+    # neighbors for every cell
+    heights, rows, cols = heightmap
+    total = 0
+    for r in range(rows):
+        base = r * cols
+        for c in range(cols):
+            i = base + c
+            val = heights[i]
+            if (r > 0 and heights[i-cols] <= val) or (r < rows-1 and heights[i+cols] <= val) or \
+               (c > 0 and heights[i-1] <= val) or (c < cols-1 and heights[i+1] <= val):
+                continue
+            total += val + 1
+    return total
+
+def label_basins(heightmap):
+    # Label the connected regions of non-9 cells in a single pass with union-find: each cell
+    # joins the label of its up and left neighbors, merging the two if they differ, or starts a
+    # new label if it has neither. A second pass resolves every label to its root and numbers
+    # the basins 0..n-1. Returns a flat array of labels (-1 for 9s) and a list of basin sizes.
+    heights, rows, cols = heightmap
+    labels = array('i', [-1]) * (rows * cols)
+    parent = []
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for r in range(rows):
+        base = r * cols
+        for c in range(cols):
+            i = base + c
+            if heights[i] == 9:
+                continue
+            up = labels[i-cols] if r else -1
+            left = labels[i-1] if c else -1
+            if up < 0 and left < 0:
+                label = len(parent)
+                parent.append(label)
+            elif up < 0:
+                label = left
+            elif left < 0 or up == left:
+                label = up
+            else:
+                label = find(up)
+                if (other := find(left)) != label:
+                    parent[other] = label
+            labels[i] = label
+
+    basin_ids = {}
+    sizes = []
+    for i, label in enumerate(labels):
+        if label < 0:
+            continue
+        root = find(label)
+        if (basin := basin_ids.get(root)) is None:
+            basin = basin_ids[root] = len(sizes)
+            sizes.append(0)
+        labels[i] = basin
+        sizes[basin] += 1
+    return labels, sizes
+
+def part_2(heightmap):
+    # Every basin has exactly one low point and is bounded by 9s, so the basins are just the
+    # connected regions of non-9 cells.
+    _, sizes = label_basins(heightmap)
+    sizes.sort(reverse=True)
+    return reduce(lambda acc, size: acc * size, sizes[:3], 1)
+
+GRID_INPUT = True
+# expand_basin rescans the whole basin for every layer it adds
+VERIFY_MAX_N_1 = 100_000
+VERIFY_MAX_N_2 = 1000
+
+def generate(n, rng):
+    # A square heightmap of about n cells. Random 9s split it into regions, and within each
+    # region the height is the distance from one random cell (capped at 8). That keeps the
+    # puzzle's promise that every basin has exactly one low point, since every other cell has a
+    # neighbor one step closer. Regenerate until there are at least the 3 basins part 2 needs.
+    side = max(5, round(n ** 0.5))
+    while True:
+        heights = [9 if rng.random() < 0.3 else None for _ in range(side * side)]
+        basins = 0
+        for start in range(side * side):
+            if heights[start] is not None:
+                continue
+            region = [start]
+            heights[start] = -1
+            for i in region:
+                for j in neighbor_indexes(i, side):
+                    if heights[j] is None:
+                        heights[j] = -1
+                        region.append(j)
+            low = rng.choice(region)
+            heights[low] = 0
+            queue = deque([low])
+            while queue:
+                i = queue.popleft()
+                for j in neighbor_indexes(i, side):
+                    if heights[j] == -1:
+                        heights[j] = min(8, heights[i] + 1)
+                        queue.append(j)
+            basins += 1
+        if basins >= 3:
+            break
+    return ''.join(''.join(str(h) for h in heights[r:r+side]) + '\n' for r in range(0, side * side, side))
+
+def neighbor_indexes(i, side):
+    r, c = divmod(i, side)
+    if r:
+        yield i - side
+    if r < side - 1:
+        yield i + side
+    if c:
+        yield i - 1
+    if c < side - 1:
+        yield i + 1
+
 FORMAT_1 = 'Sum of risk levels: {}'
 FORMAT_2 = 'Product of sizes of 3 largest basins: {}'
 
@@ -1,10 +1,9 @@
 # Advent of Code 2021
 # Day 10
 
-import itertools, re
-from dataclasses import dataclass
-from pprint import pprint
-from statistics import median
+import logging
+
+log = logging.getLogger(__name__)
 
 OPPOSITE = {
     '(': ')',
@@ -28,7 +27,7 @@ def line_error(line):
             if stack.pop() != OPPOSITE[c]:
                 return i, c
         else:
-            print(f'warning: invalid character "{c}" at position {i} of line "{line}"')
+            log.warning('invalid character "%s" at position %d of line "%s"', c, i, line)
 
     # if incomplete, return the unfinished stack.
     # note: different return types to indicate different error types
@@ -37,14 +36,59 @@ def line_error(line):
     # if all good, return None
     return None
 
-def part_1(data):
+def parse(data):
+    return data.splitlines()
+
+# Fast path for scan_line: character class for every byte, 1-4 for the opening brackets,
+# 5-8 for the matching closing ones, 0 for anything else
+CLASSES = bytearray(256)
+for i, (o, c) in enumerate(zip(b'([{<', b')]}>'), start=1):
+    CLASSES[o] = i
+    CLASSES[c] = i + 4
+CLASSES = bytes(CLASSES)
+# syntax error score for each closing class
+ERROR_SCORES = {5: 3, 6: 57, 7: 1197, 8: 25137}
+
+def scan_line(line):
+    # Same checks as line_error, but translating the line to character classes up front and
+    # scoring as it goes. Returns an int: 0 if the line is fine, minus the syntax error score if
+    # it's corrupted, or the autocomplete score if it's incomplete. Invalid characters are
+    # skipped. (A preallocated array for the stack benchmarked slower than a plain list with
+    # append/pop.)
+    if isinstance(line, str):
+        line = line.encode()
+    stack = []
+    push = stack.append
+    pop = stack.pop
+    for k in line.translate(CLASSES):
+        if k <= 4:
+            if k:
+                push(k)
+        elif not stack or pop() != k - 4:
+            return -ERROR_SCORES[k]
+
+    # incomplete: closing the opening brackets in reverse order scores 1-4 each, which is
+    # exactly their class number
+    score = 0
+    for k in reversed(stack):
+        score = score * 5 + k
+    return score
+
+def part_1(lines):
+    # printing every line is the slow part, don't bother with line_error unless we're going to
+    if log.isEnabledFor(logging.DEBUG):
+        return verify_part_1(lines)
+    return -sum(r for r in map(scan_line, lines) if r < 0)
+
+def verify_part_1(lines):
+    # the original line_error version, which can also show every corrupted line
     score = 0
-    for line in data.splitlines():
+    for line in lines:
         err = line_error(line)
         if err is None or isinstance(err, list):
             continue # skip good lines and incomplete lines which return a stack
         i, c = err
-        print(f'{line} - illegal {c} at position {i}')
+        log.debug('%s - illegal %s at position %d', line, c, i)
         if c == ')':
             score += 3
         elif c == ']':
@@ -55,10 +99,19 @@ def part_1(data):
             score += 25137
     return score
 
+def median(scores):
+    # there's always an odd number of incomplete lines, so this is just the middle score
+    scores = sorted(scores)
+    return scores[len(scores) // 2]
 
-def part_2(data):
+def part_2(lines):
+    if log.isEnabledFor(logging.DEBUG):
+        return verify_part_2(lines)
+    return median(r for r in map(scan_line, lines) if r > 0)
+
+def verify_part_2(lines):
     scores = []
-    for line in data.splitlines():
+    for line in lines:
         err = line_error(line)
         if not isinstance(err, list):
             continue # skip all but incomplete lines
@@ -69,10 +122,44 @@ def part_2(data):
             score *= 5
             score += 1 if c == ')' else 2 if c == ']' else 3 if c == '}' else 4 if c == '>' else None
 
-        print(f'{line}  {"".join(tail)} {score=}')
+        log.debug('%s  %s score=%d', line, ''.join(tail), score)
         scores.append(score)
     return median(scores)
 
+STREAM_PARTS = (1, 2)
+VERIFY_MAX_N_1 = VERIFY_MAX_N_2 = 100_000
+
+def generate(n, rng):
+    # n lines which are each either corrupted or incomplete, like the puzzle input. There's
+    # always an odd number of incomplete lines so that part 2 has a middle score.
+    incomplete = n // 2 | 1
+    kinds = [True] * incomplete + [False] * (n - incomplete)
+    rng.shuffle(kinds)
+    lines = []
+    for is_incomplete in kinds:
+        length = rng.randint(20, 110)
+        corrupt_at = None if is_incomplete else rng.randrange(length)
+        stack = []
+        line = []
+        while len(line) < length:
+            if corrupt_at is not None and len(line) >= corrupt_at and stack:
+                # the wrong closing char, then anything at all
+                line.append(rng.choice([c for c in ')]}>' if c != OPPOSITE[stack[-1]]]))
+                line.extend(rng.choice('()[]{}<>') for _ in range(length - len(line)))
+                break
+            if stack and rng.random() < 0.45:
+                line.append(OPPOSITE[stack.pop()])
+            else:
+                stack.append(rng.choice('([{<'))
+                line.append(stack[-1])
+        else:
+            # ran out of room without corrupting it, or closed everything in an incomplete line
+            if not stack or corrupt_at is not None:
+                line.append(rng.choice('([{<'))
+                if corrupt_at is not None:
+                    line.append(rng.choice([c for c in ')]}>' if c != OPPOSITE[line[-1]]]))
+        lines.append(''.join(line) + '\n')
+    return ''.join(lines)
 
 FORMAT_1 = 'Total syntax error score: {}'
 FORMAT_2 = 'Middle autocomplete score: {}'
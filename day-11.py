@@ -1,96 +1,275 @@
 # Advent of Code 2021
 # Day 11
 
-import itertools, re
-from dataclasses import dataclass
-from pprint import pprint
-
-COLS = 10
-ROWS = 10
-
-def iter_cells():
-    for r in range(ROWS):
-        for c in range(COLS):
-            yield r, c
-
-def neighbors(r, c):
-    for dr, dc in itertools.product(range(-1, 2), range(-1, 2)):
-        nr = r + dr
-        nc = c + dc
-        if (dr or dc) and 0 <= nr < ROWS and 0 <= nc < COLS:
-            yield nr, nc
-
-def load_grid(data):
-    grid = []
-    for line in data.splitlines():
-        row = [int(c) for c in line]
-        assert len(row) == COLS
-        grid.append(row)
-    assert len(grid) == COLS
-    return grid
-
-def print_grid(grid):
-    print('\n'.join(''.join(str(c) for c in r) for r in grid))
-    print()
-
-def print_grid_2d(grid):
-    print('\n'.join(' '.join(f'{c:2}' for c in r) for r in grid))
-    print()
-
-def step(grid):
+import functools, hashlib, itertools
+from lazy_numpy import import_numpy
+
+def parse(data):
+    # returns the energy levels as flat bytes (one byte per cell, row-major) and the grid size
+    lines = data.splitlines()
+    rows = len(lines)
+    cols = len(lines[0])
+    assert all(len(line) == cols for line in lines)
+    energy = ''.join(lines).encode().translate(DIGIT_VALUES)
+    assert max(energy) <= 9
+    return energy, rows, cols
+
+DIGIT_VALUES = bytes.maketrans(b'0123456789', bytes(range(10)))
+# bytes.translate tables to add 1 to every cell, and to reset every cell which flashed to 0
+INCREMENT = bytes(range(1, 256)) + b'\xff'
+RESET = bytes(range(10)) + bytes(246)
+
+@functools.lru_cache
+def neighbor_table(rows, cols):
+    # for each flat cell index, a tuple of the flat indexes of its (up to 8) neighbors
+    table = []
+    for r in range(rows):
+        for c in range(cols):
+            table.append(tuple(nr * cols + nc
+                               for nr in range(max(r-1, 0), min(r+2, rows))
+                               for nc in range(max(c-1, 0), min(c+2, cols))
+                               if nr != r or nc != c))
+    return table
+
+class Octopuses:
+    def __init__(self, energy, rows, cols):
+        self.energy = bytearray(energy)
+        self.rows = rows
+        self.cols = cols
+        self.size = rows * cols
+        self.neighbors = neighbor_table(rows, cols)
+
+    def step(self):
+        # first, increase all energy levels by 1
+        energy = self.energy = bytearray(self.energy.translate(INCREMENT))
+
+        # Now handle flashes with a worklist. A cell flashes exactly when its energy goes from 9
+        # to 10, anything after that just pushes it higher, so each cell is queued at most once
+        # without needing a separate flashed grid.
+        queue = []
+        i = energy.find(10)
+        while i >= 0:
+            queue.append(i)
+            i = energy.find(10, i + 1)
+        flashes = 0
+        neighbors = self.neighbors
+        while queue:
+            flashes += 1
+            for n in neighbors[queue.pop()]:
+                energy[n] += 1
+                if energy[n] == 10:
+                    queue.append(n)
+
+        # reset all cells which flashed, return the number of flashes this step
+        self.energy = bytearray(energy.translate(RESET))
+        return flashes
+
+    def state_hash(self):
+        return hashlib.blake2b(self.energy, digest_size=16).digest()
+
+class NumpyOctopuses:
+    # Same interface as Octopuses, but each step is whole-array operations with no per-cell
+    # python loops, which wins on large grids. energy is a (rows, cols) array, or a stack of
+    # independent grids with shape (grids, rows, cols), in which case step() returns an array of
+    # flashes for each grid.
+    def __init__(self, energy):
+        np = import_numpy()
+        self.energy = np.array(energy, dtype=np.uint8)
+        assert self.energy.ndim in (2, 3)
+        self.rows, self.cols = self.energy.shape[-2:]
+        self.size = self.rows * self.cols
+
+    @staticmethod
+    def neighbor_sum(mask):
+        # for every cell, how many of its 8 neighbors are set in mask, by adding up shifted
+        # views of a zero-padded copy (a 3x3 convolution without the center)
+        np = import_numpy()
+        pad = [(0, 0)] * (mask.ndim - 2) + [(1, 1), (1, 1)]
+        p = np.pad(mask.view(np.uint8), pad)
+        total = np.zeros(mask.shape, dtype=np.uint8)
+        for dr, dc in itertools.product(range(3), range(3)):
+            if dr != 1 or dc != 1:
+                total += p[..., dr:dr + mask.shape[-2], dc:dc + mask.shape[-1]]
+        return total
+
+    def step(self):
+        np = import_numpy()
+        energy = self.energy
+        energy += 1
+        # Keep flashing every cell over 9 that hasn't flashed yet and bumping its neighbors, until
+        # a pass doesn't find any new ones. Energy can't go over 9 + 1 + 8, so uint8 is plenty.
+        flashed = np.zeros(energy.shape, dtype=bool)
+        while (new := (energy > 9) & ~flashed).any():
+            flashed |= new
+            energy += self.neighbor_sum(new)
+        energy[flashed] = 0
+        flashes = flashed.sum(axis=(-2, -1))
+        return int(flashes) if energy.ndim == 2 else flashes
+
+    def state_hash(self):
+        return hashlib.blake2b(self.energy.tobytes(), digest_size=16).digest()
+
+# grids with at least this many cells use NumpyOctopuses, if numpy is available
+NUMPY_MIN_CELLS = 10_000
+
+def make_octopuses(grid):
+    energy, rows, cols = grid
+    if rows * cols >= NUMPY_MIN_CELLS and (np := import_numpy()) is not None:
+        return NumpyOctopuses(np.frombuffer(energy, dtype=np.uint8).reshape(rows, cols))
+    return Octopuses(energy, rows, cols)
+
+def flashes_batch(energies, steps):
+    # total flashes after the given number of steps for each grid in a (grids, rows, cols) stack
+    np = import_numpy()
+    octopuses = NumpyOctopuses(energies)
+    totals = np.zeros(octopuses.energy.shape[0], dtype=np.int64)
+    for _ in range(steps):
+        totals += octopuses.step()
+    return totals
+
+def first_sync_batch(energies, max_steps):
+    # first step where every cell flashes at once for each grid in a (grids, rows, cols) stack,
+    # or -1 for grids that don't get there within max_steps
+    np = import_numpy()
+    octopuses = NumpyOctopuses(energies)
+    first = np.full(octopuses.energy.shape[0], -1, dtype=np.int64)
+    for s in range(1, max_steps + 1):
+        synced = (octopuses.step() == octopuses.size) & (first < 0)
+        first[synced] = s
+        if (first >= 0).all():
+            break
+    return first
+
+def flashes_after(octopuses, steps):
+    # Total flashes after the given number of steps. The simulation is deterministic, so once
+    # the grid gets back to a state it's been in before it repeats that cycle forever, and we
+    # can work out the rest of the flashes without simulating them.
+    seen = {}
+    totals = [0]
+    for s in range(steps):
+        state = octopuses.state_hash()
+        if (start := seen.get(state)) is not None:
+            period = s - start
+            cycles, rem = divmod(steps - start, period)
+            return totals[start] + cycles * (totals[s] - totals[start]) + totals[start + rem] - totals[start]
+        seen[state] = s
+        totals.append(totals[-1] + octopuses.step())
+    return totals[steps]
+
+def first_sync(octopuses):
+    # The first step where every cell flashes at once, or None if the grid gets into a cycle
+    # which never gets there.
+    seen = set()
+    for s in itertools.count(start=1):
+        state = octopuses.state_hash()
+        if state in seen:
+            return None
+        seen.add(state)
+        if octopuses.step() == octopuses.size:
+            return s
+
+def part_1(grid):
+    return flashes_after(make_octopuses(grid), 100)
+
+def part_2(grid):
+    # find the first step where all cells flash at once
+    return first_sync(make_octopuses(grid))
+
+GRID_INPUT = True
+
+def load_grid_2d(grid):
+    energy, rows, cols = grid
+    return [list(energy[r*cols:(r+1)*cols]) for r in range(rows)]
+
+def step_2d(grid):
+    # The straightforward version of a step on a 2D list grid, for checking the others against.
+    # Returns the number of flashes.
+    rows = len(grid)
+    cols = len(grid[0])
+    cells = list(itertools.product(range(rows), range(cols)))
+
     # first, increase all energy levels by 1
-    for r, c in iter_cells():
+    for r, c in cells:
         grid[r][c] += 1
 
-    #print(f'After increment')
-    #print_grid_2d(grid)
-
     # now handle flashes. each octopus can only flash once
-    flashed = [[False]*COLS for _ in range(ROWS)]
+    flashed = [[False]*cols for _ in range(rows)]
     # can only flash once per step, but we have to make multiple passes through the grid
     # in case lower cells cause a flash in an upper cell after it's already been processed once
     while True:
         flashed_this_pass = False
-        for r, c in iter_cells():
+        for r, c in cells:
             if grid[r][c] > 9 and not flashed[r][c]:
                 flashed[r][c] = True
                 flashed_this_pass = True
-                for nr, nc in neighbors(r, c):
-                    grid[nr][nc] += 1
-                #print(f'Flashed cell {r}, {c}')
-                #print_grid_2d(grid)
+                for dr, dc in itertools.product(range(-1, 2), range(-1, 2)):
+                    nr = r + dr
+                    nc = c + dc
+                    if (dr or dc) and 0 <= nr < rows and 0 <= nc < cols:
+                        grid[nr][nc] += 1
         if not flashed_this_pass:
             break
 
     # reset all cells which flashed
-    for r, c in iter_cells():
+    for r, c in cells:
         if grid[r][c] > 9:
-            assert flashed[r][c]
             grid[r][c] = 0
-        else:
-            assert not flashed[r][c]
-
-    # return the number of flashes this step
-    return sum(sum(c for c in r) for r in flashed)
-
-def part_1(data):
-    grid = load_grid(data)
-    flashes = 0
-    for s in range(1, 101):
-        flashes += step(grid)
-        #if s <= 10:
-        #    print(f'After step {s}')
-        #    print_grid(grid)
-    return flashes
-
-def part_2(data):
-    grid = load_grid(data)
-    # find the first step where all cells flash at once
+
+    return sum(sum(r) for r in flashed)
+
+def verify_part_1(grid):
+    grid = load_grid_2d(grid)
+    return sum(step_2d(grid) for _ in range(100))
+
+def verify_part_2(grid):
+    grid = load_grid_2d(grid)
+    size = len(grid) * len(grid[0])
+    # stop once a state repeats, like first_sync, rather than looping forever
+    seen = set()
     for s in itertools.count(start=1):
-        flashes = step(grid)
-        if flashes == ROWS * COLS:
+        state = tuple(map(tuple, grid))
+        if state in seen:
+            return None
+        seen.add(state)
+        if step_2d(grid) == size:
             return s
 
+def check(grid):
+    # Cross-check the numpy engines against Octopuses. The batch functions get the grid and its
+    # three mirror images, which all flash exactly the same because neighbors are symmetric.
+    if (np := import_numpy()) is None:
+        return
+    energy, rows, cols = grid
+    flashes = flashes_after(Octopuses(energy, rows, cols), 100)
+    # like first_sync, but also keep track of how many steps it took to find the answer
+    octopuses = Octopuses(energy, rows, cols)
+    seen = set()
+    first = -1
+    while (state := octopuses.state_hash()) not in seen:
+        seen.add(state)
+        if octopuses.step() == octopuses.size:
+            first = len(seen)
+            break
+
+    g = np.frombuffer(bytes(energy), dtype=np.uint8).reshape(rows, cols)
+    if (single := flashes_after(NumpyOctopuses(g), 100)) != flashes:
+        raise AssertionError(f'NumpyOctopuses gave {single} flashes after 100 steps, '
+                             f'Octopuses gave {flashes}')
+    stack = np.stack([g, g[::-1], g[:, ::-1], g[::-1, ::-1]])
+    if (batch := flashes_batch(stack, 100).tolist()) != [flashes] * 4:
+        raise AssertionError(f'flashes_batch gave {batch} for the mirrored grids, expected {flashes}')
+    if (batch := first_sync_batch(stack, len(seen)).tolist()) != [first] * 4:
+        raise AssertionError(f'first_sync_batch gave {batch} for the mirrored grids, expected {first}')
+
+VERIFY_MAX_N_1 = VERIFY_MAX_N_2 = 1000
+
+def generate(n, rng):
+    # A square grid of about n octopuses. Energies are 0-5 rather than 0-9 because random grids
+    # with the full range mostly fall into a cycle that never synchronizes, and finding that takes
+    # minutes on big grids. With 0-5 most grids synchronize within a few dozen steps.
+    side = max(3, round(n ** 0.5))
+    return ''.join(''.join(str(rng.randrange(6)) for _ in range(side)) + '\n' for _ in range(side))
+
 FORMAT_1 = 'Total flashes after 100 steps: {}'
 FORMAT_2 = '{}'
 
@@ -107,5 +286,15 @@ testgrid = '''\
 5283751526
 '''
 
-TEST_CASE_1 = [(testgrid, 1656)]
-TEST_CASE_2 = [(testgrid, 195)]
+def tile_grid(grid, times, levels=None):
+    # A grid made of times x times copies of grid, big enough for make_octopuses to use
+    # NumpyOctopuses. With levels, every copy's energies are shifted by its position and taken
+    # mod levels, so they differ and can synchronize.
+    lines = grid.splitlines()
+    def cell(e, tr, tc):
+        return e if levels is None else str((int(e) + tr + tc) % levels)
+    return ''.join(''.join(cell(e, tr, tc) for tc in range(times) for e in line) + '\n'
+                   for tr in range(times) for line in lines)
+
+TEST_CASE_1 = [(testgrid, 1656), (tile_grid(testgrid, 10), 160503)]
+TEST_CASE_2 = [(testgrid, 195), (tile_grid(testgrid, 10, levels=6), 21)]
@@ -0,0 +1,19 @@
+# Advent of Code 2021
+# Lazy numpy import shared by aoc.py and the days
+#
+# numpy takes longer to import than most puzzle inputs take to solve, so nothing imports it at the
+# top. Code with a numpy fast path calls import_numpy() once it has an input big enough to need
+# it, and falls back to plain python if that returns None.
+
+_numpy = None
+
+def import_numpy():
+    # returns the numpy module, or None if it isn't available
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+        except ImportError:
+            return None
+        _numpy = numpy
+    return _numpy